@@ -0,0 +1,384 @@
+"""
+Scanner backends that find the declarations of a file by parsing it as a
+whole, instead of the keyword heuristics of `Builder.scan`.
+
+A backend takes a SourceBuffer and the config of a builder and returns
+(documented, candidate) pairs in line order for the declarations that use
+the builder's keywords. It returns None when it cannot parse the file, so
+that the heuristics are used instead. Backends are picked per format with
+the `scanner` key, and the parse itself is done once per file and shared
+by the builders through `SourceBuffer.parse`.
+"""
+
+import re
+import ast
+import bisect
+from .scanner import Candidate
+from .utils import get_leading_whitespace
+
+FUNCTIONS = tuple(
+    getattr(ast, name)
+    for name in ("FunctionDef", "AsyncFunctionDef")
+    if hasattr(ast, name)
+)
+
+
+def python_ast(source, config):
+    """
+    Python backend based on the `ast` module
+    Parameters
+    ----------
+    SourceBuffer source: Buffer of the file
+    dict config: Config of the builder
+    """
+    declarations = source.parse("ast", parse_python)
+    if declarations is None:
+        return None
+    keywords = config.get("keywords", [])
+    return [
+        (documented, candidate)
+        for keyword, documented, candidate in declarations
+        if keyword in keywords
+    ]
+
+
+def parse_python(source):
+    """
+    Finds the functions and classes of a Python file in one parse with the
+    `ast` module. Docstrings, decorators and strings in default values are
+    all told apart by the parser itself. Returns (keyword, documented,
+    candidate) tuples, None on a syntax error
+    Parameters
+    ----------
+    SourceBuffer source: Buffer of the file
+    """
+    try:
+        tree = ast.parse("".join(source.lines), source.filename)
+    except (SyntaxError, ValueError):
+        return None
+
+    declarations = []
+    for node in ast.walk(tree):
+        if isinstance(node, FUNCTIONS):
+            keyword = "def"
+            arguments = _argument_names(node.args)
+        elif isinstance(node, ast.ClassDef):
+            keyword = "class"
+            arguments = [base.id for base in node.bases if isinstance(base, ast.Name)]
+        else:
+            continue
+        header = _header(source, node)
+        if header is None:
+            # The body is on the declaration line, there is no room for a docstring
+            continue
+        decl_start, start = header
+        indent = get_leading_whitespace(source.line(decl_start))
+        candidate = Candidate(
+            name=node.name,
+            start=start,
+            end=source.scopes.end(start, len(indent)),
+            decl_start=decl_start,
+            indent=indent,
+            arguments=arguments,
+        )
+        declarations.append((keyword, ast.get_docstring(node) is not None, candidate))
+    return sorted(declarations, key=lambda declaration: declaration[2].start)
+
+
+def _header(source, node):
+    """
+    First and last lines of the declaration of a function or class node,
+    None if its body starts on the same line
+    Parameters
+    ----------
+    SourceBuffer source: Buffer of the file
+    ast.AST node: Function or class node
+    """
+    first = node.body[0]
+    # Since Python 3.8 the line of a decorated node is its `def`, not its
+    # first decorator, so a decorated first statement starts at its decorators
+    body = min(
+        [first.lineno]
+        + [decorator.lineno for decorator in getattr(first, "decorator_list", [])]
+    )
+    decl_start = node.lineno
+    # Before Python 3.8 the line of a decorated node is its first decorator's
+    while decl_start < body and not _is_declaration(source.line(decl_start)):
+        decl_start += 1
+    start = body - 1
+    while start > decl_start and _is_blank_or_comment(source.line(start)):
+        start -= 1
+    if start < decl_start:
+        return None
+    return decl_start, start
+
+
+def _is_declaration(line):
+    """
+    Checks if a line starts a `def`, `async def` or `class` statement
+    Parameters
+    ----------
+    str line: Line text
+    """
+    words = line.split()
+    return bool(words) and words[0] in ("def", "async", "class")
+
+
+def _is_blank_or_comment(line):
+    """
+    Checks if a line holds nothing but whitespace or a comment
+    Parameters
+    ----------
+    str line: Line text
+    """
+    stripped = line.strip()
+    return not stripped or stripped.startswith("#")
+
+
+def _argument_names(arguments):
+    """
+    Names of the arguments of a function in the order they are declared
+    Parameters
+    ----------
+    ast.arguments arguments: Arguments node of a function
+    """
+    nodes = getattr(arguments, "posonlyargs", []) + arguments.args
+    nodes.append(arguments.vararg)
+    nodes += getattr(arguments, "kwonlyargs", [])
+    nodes.append(arguments.kwarg)
+    names = []
+    for node in nodes:
+        # Python 2 uses Name nodes for arguments and plain strings for * and **
+        name = node if isinstance(node, str) else getattr(node, "arg", None)
+        name = name or getattr(node, "id", None)
+        if name:
+            names.append(name)
+    return names
+
+
+class Block(object):
+    """
+    A braced block found by `brace_blocks`: the code before its opening
+    brace, with comments and string contents left out, and its lines
+    """
+
+    __slots__ = ("header", "decl_start", "start", "end", "before", "inside")
+
+    def __init__(self, header, decl_start, start, before, inside):
+        self.header = header
+        self.decl_start = decl_start
+        self.start = start
+        self.end = None
+        self.before = before
+        self.inside = inside
+
+
+# Tokens that change the state of the brace lexer, anything else is code
+TOKENS = re.compile(r"//|/\*|[\"'`{};]")
+STRINGS = {
+    '"': re.compile(r'(?:\\.|[^"\\\n])*(?:"|\n|$)'),
+    "'": re.compile(r"(?:\\.|[^'\\\n])*(?:'|\n|$)"),
+    "`": re.compile(r"(?:\\.|[^`\\])*(?:`|$)"),
+}
+IDENTIFIER = re.compile(r"[A-Za-z_$][\w$]*")
+# Words that declare a type. Found after a method keyword, i.e `public class`,
+# they make the block a type instead of a method
+TYPE_DECLARATIONS = (
+    "class",
+    "interface",
+    "enum",
+    "struct",
+    "record",
+    "trait",
+    "namespace",
+    "object",
+)
+
+
+def brace_blocks(source):
+    """
+    Lexes a C-family file in a single pass and returns its braced blocks
+    in the order they open. Braces inside comments and string literals
+    are skipped
+    Parameters
+    ----------
+    SourceBuffer source: Buffer of the file
+    """
+    content = "".join(source.lines)
+
+    def line_of(position):
+        return bisect.bisect_right(source.offsets, position)
+
+    blocks = []
+    opened = []
+    # Header of the next block: the code since the last `;`, `{` or `}`
+    pieces = []
+    code_from = 0
+    header_at = None
+    before = ""
+    position = 0
+    while True:
+        match = TOKENS.search(content, position)
+        if match is None:
+            break
+        token = match.group()
+        at = match.start()
+        code = content[code_from:at]
+        if header_at is None and code.strip():
+            header_at = code_from + len(code) - len(code.lstrip())
+
+        if token in ("//", "/*"):
+            closing = "\n" if token == "//" else "*/"
+            end = content.find(closing, match.end())
+            end = len(content) if end == -1 else end + len(closing)
+            pieces.append(code)
+            if header_at is None:
+                before = content[at:end].strip()
+            code_from = position = end
+            continue
+        if token in STRINGS:
+            end = STRINGS[token].match(content, match.end()).end()
+            pieces.append(code + token + token)
+            code_from = position = end
+            continue
+
+        if token == "{":
+            inside = content[at + 1 :].lstrip()
+            block = Block(
+                header=("".join(pieces) + code).strip(),
+                decl_start=line_of(at if header_at is None else header_at),
+                start=line_of(at),
+                before=before,
+                inside=inside[: inside.find("\n")] if "\n" in inside else inside,
+            )
+            blocks.append(block)
+            opened.append(block)
+        elif token == "}" and opened:
+            opened.pop().end = line_of(at)
+        pieces = []
+        header_at = None
+        before = ""
+        code_from = position = at + 1
+
+    for block in opened:
+        block.end = len(source)
+    return blocks
+
+
+def braces(source, config):
+    """
+    Backend for C-family formats, where braces delimit bodies instead of
+    indentation. A block is a declaration when the code before its brace
+    uses one of the keywords, i.e `function`, `func` or `class`
+    Parameters
+    ----------
+    SourceBuffer source: Buffer of the file
+    dict config: Config of the builder
+    """
+    keywords = config.get("keywords", [])
+    opening = config.get("open") or ""
+    last = config.get("argument_names") != "first"
+    declarations = []
+    for block in source.parse("brace", brace_blocks):
+        signature = _signature(block.header, keywords, last=last)
+        if signature is None:
+            continue
+        name, arguments = signature
+        comment = block.inside if config.get("within_scope") else block.before
+        candidate = Candidate(
+            name=name,
+            start=block.start,
+            end=block.end,
+            decl_start=block.decl_start,
+            indent=get_leading_whitespace(source.line(block.decl_start)),
+            arguments=arguments,
+        )
+        declarations.append((bool(opening) and comment.startswith(opening), candidate))
+    return declarations
+
+
+def _signature(header, keywords, last=True):
+    """
+    Name and argument names declared by the header of a block, None if it
+    does not use any of the keywords, has no name or declares a type that
+    is not one of the keywords. The name of an argument is its last
+    identifier before any `:` type or `=` default, i.e `int first` in
+    Java, or its first one for languages like Go that write `first int`
+    Parameters
+    ----------
+    str header: Code before the opening brace of a block
+    list keywords: Keywords that start a declaration
+    bool last: Take the last identifier of an argument as its name
+    """
+    for match in IDENTIFIER.finditer(header):
+        if match.group() in keywords:
+            break
+    else:
+        return None
+    rest = header[match.end() :].lstrip()
+    if rest.startswith("("):
+        # Receiver of a Go method, or the arguments of an anonymous function
+        rest = rest[_closing(rest, 0) + 1 :]
+    paren = rest.find("(")
+    names = IDENTIFIER.findall(rest if paren == -1 else rest[:paren])
+    if not names or any(
+        name in TYPE_DECLARATIONS and name not in keywords for name in names
+    ):
+        return None
+    if paren == -1:
+        return names[0], []
+
+    arguments = []
+    for argument in _split_arguments(rest[paren + 1 : _closing(rest, paren)]):
+        found = IDENTIFIER.findall(re.split(r"[:=]", argument, 1)[0])
+        if found:
+            arguments.append(found[-1] if last else found[0])
+    return names[-1], arguments
+
+
+def _closing(text, index):
+    """
+    Index of the bracket closing the one at `index`, the end of the text
+    if it is never closed
+    Parameters
+    ----------
+    str text: Code
+    int index: Index of an opening bracket
+    """
+    depth = 0
+    for position in range(index, len(text)):
+        if text[position] in "([{":
+            depth += 1
+        elif text[position] in ")]}":
+            depth -= 1
+            if not depth:
+                return position
+    return len(text)
+
+
+def _split_arguments(text):
+    """
+    Splits an argument list on the commas that are not nested in brackets,
+    generics like `Map<K, V>` included. The `>` of an arrow is not a bracket
+    Parameters
+    ----------
+    str text: Code between the parentheses of a declaration
+    """
+    arguments = []
+    depth = 0
+    last = 0
+    for position, char in enumerate(text):
+        if char in "([{<":
+            depth += 1
+        elif char in ")]}" or (
+            char == ">" and text[position - 1 : position] not in "=-"
+        ):
+            depth -= 1
+        elif char == "," and not depth:
+            arguments.append(text[last:position])
+            last = position + 1
+    arguments.append(text[last:])
+    return arguments
+
+
+SCANNERS = {"ast": python_ast, "brace": braces}
@@ -1,37 +1,119 @@
 """
 Base file that contains the core classes that are used in dyc.
 """
-import fileinput
-from .utils import all_files_generator, get_file_lines, is_one_line_method, is_comment
+import os
+import git
+from .utils import (
+    all_files_generator,
+    git_files,
+    is_one_line_method,
+    is_comment,
+    PathRules,
+    HunkIndex,
+)
+from .scanner import open_source
+from .backends import SCANNERS
+
+
+class RunState(object):
+    """
+    State shared by the builders of a single DYC run: the confirmed
+    candidates per file and the files whose name was already echoed.
+    Entries are released as soon as a file is applied, so a long watch
+    session does not keep growing it
+    """
+
+    def __init__(self):
+        self.details = dict()
+        self.printed = set()
+
+    def release(self, filename):
+        """
+        Forgets everything about a file once it is applied
+        Parameters
+        ----------
+        str filename: The file's name
+        """
+        self.details.pop(filename, None)
+        self.printed.discard(filename)
 
 
 class Builder(object):
-    def __init__(self, filename, config, placeholders=False, skip_confirm=False):
+    def __init__(
+        self,
+        filename,
+        config,
+        placeholders=False,
+        skip_confirm=False,
+        source=None,
+        state=None,
+    ):
         self.filename = filename
         self.config = config
         self.placeholders = placeholders
         self.skip_confirm = skip_confirm
+        self._source = source
+        self.state = state if state is not None else RunState()
 
-    details = dict()
+    @property
+    def details(self):
+        """
+        Confirmed candidates of the run, by file and then by the line their
+        declaration ends on, since names repeat, i.e `run` in two classes
+        """
+        return self.state.details
 
-    def initialize(self, change=None):
+    @property
+    def source(self):
+        """
+        The SourceBuffer of the file, read from disk on first access only
+        """
+        if self._source is None:
+            self._source = open_source(self.filename)
+        return self._source
+
+    def initialize(self, change=None, candidates=None):
         """
         The Builder's main method. It stores all the changes that needs to be made
         in `self.details` for a file. Which would then be used to add Docstrings to.
+        Parameters
+        ----------
+        dict change: Change of the file in a diff
+        list candidates: Result of a `scan` that already ran, i.e in a worker process
+        """
+        if candidates is None:
+            candidates = self.scan(change=change)
+
+        if not self.details.get(self.filename):
+            self.details[self.filename] = dict()
+
+        for result in candidates:
+            if self.confirm(result):
+                self.details[self.filename][result.start] = self.interface(result)
+
+    def scan(self, change=None):
         """
-        result = dict()
+        Finds the candidates of the file that are subject to docstrings. It
+        never prompts, so it can run in a worker process and its result
+        can be pickled back
+        Parameters
+        ----------
+        dict change: Change of the file in a diff
+        """
+        candidates = []
 
-        patches = []
-        if change:
-            patches = change.get("additions")
+        patches = HunkIndex(change.get("additions") if change else [])
 
-        fileLines = list(fileinput.input(self.filename))
-        i = 0
+        declarations = self.declarations()
+        if declarations is not None:
+            return self._pick_declarations(declarations, change, patches)
 
-        for line in fileinput.input(self.filename):
-            filename = fileinput.filename()
-            lineno = fileinput.lineno()
-            keywords = self.config.get("keywords")
+        filename = self.filename
+        length = len(self.source)
+        keywords = self.config.get("keywords")
+
+        for lineno in self.source.find_lines(keywords):
+            line = self.source.line(lineno)
             foundList = [
                 word.lstrip() for word in line.split(" ") if word.lstrip() in keywords
             ]
@@ -45,28 +127,83 @@ class Builder(object):
                 if openP == closeP:
                     pass
                 else:
-                    pos = i
-                    while openP != closeP:
+                    pos = lineno
+                    while openP != closeP and pos < length:
                         pos += 1
-                        line += fileLines[pos]
+                        line += self.source.line(pos)
                         openP = line.count("(")
                         closeP = line.count(")")
-                    lineno = pos + 1
-            i = i + 1
+                    lineno = pos
 
             if change and found:
                 found = self._is_line_part_of_patches(lineno, line, patches)
 
-            if not self.details.get(filename):
-                self.details[filename] = dict()
-
             if found:
-                length = get_file_lines(filename)
                 result = self.extract_and_set_information(
                     filename, lineno, line, length
                 )
-                if self.validate(result):
-                    self.details[filename][result.name] = result
+                if self.is_candidate(result):
+                    candidates.append(result)
+
+        return candidates
+
+    def declarations(self):
+        """
+        Declarations of the file found by the scanner backend of the format,
+        None to use the keyword heuristics, i.e when there is no backend or
+        it could not parse the file. Backends parse whole files, so mapped
+        large files always use the heuristics
+        """
+        backend = SCANNERS.get(self.config.get("scanner"))
+        if backend is None or self.source.mapped:
+            return None
+        return backend(self.source, self.config)
+
+    def _pick_declarations(self, declarations, change, patches):
+        """
+        Keeps the undocumented declarations that are not ignored and, with
+        a diff, that are part of the added lines
+        Parameters
+        ----------
+        list declarations: (documented, candidate) pairs of a backend
+        dict change: Change of the file in a diff
+        HunkIndex patches: Index of the added hunks
+        """
+        candidates = []
+        ignore = self.config.get("ignore", [])
+        for documented, candidate in declarations:
+            if documented or candidate.name in ignore:
+                continue
+            if change and not self._is_line_part_of_patches(
+                candidate.start,
+                self.source.text(candidate.decl_start, candidate.start),
+                patches,
+            ):
+                continue
+            candidates.append(candidate)
+        return candidates
+
+    def interface(self, candidate):
+        """
+        Turns a confirmed candidate into what `prompts` and `edits` work on.
+        By default the candidate itself
+        Parameters
+        ----------
+        Candidate candidate: A confirmed candidate
+        """
+        return candidate
+
+    def is_candidate(self, result):
+        """
+        Abstract predicate that checks if an extracted result needs a docstring
+        """
+        return bool(result)
+
+    def confirm(self, result):
+        """
+        Abstract method that asks the user to confirm a candidate
+        """
+        return True
 
     def _is_line_part_of_patches(self, lineno, line, patches):
         """
@@ -75,36 +212,26 @@ class Builder(object):
         ----------
         int lineno: Line number
         str line: Line text in a patch
-        list patches: List of patches
-        """
-        result = False
-        for change in patches:
-            start, end = change.get("hunk")
-            if start <= lineno <= end:
-                patch = change.get("patch")
-                found = filter(lambda l: line.replace("\n", "") == l, patch.split("\n"))
-                if found:
-                    result = True
-                    break
-
-                # Try to catch unusual declared methods
-                broken_lines = line.split("\n")
-                if len(broken_lines) and not is_one_line_method(
-                    broken_lines[0], self.config.get("keywords")
-                ):
-                    result = True
-                    break
-        return result
+        HunkIndex patches: Index of the added hunks
+        """
+        hunk = patches.find(lineno)
+        if hunk is None:
+            return False
+        if line.replace("\n", "") in patches.added_lines(hunk):
+            return True
+
+        # Try to catch unusual declared methods
+        broken_lines = line.split("\n")
+        return bool(
+            len(broken_lines)
+            and not is_one_line_method(broken_lines[0], self.config.get("keywords"))
+        )
 
     def clear(self, filename):
         """
         Clear changes in a filename
         """
-        try:
-            del self.details[filename]
-        except KeyError:
-            # Probably the filename is not already there
-            return
+        self.state.release(filename)
 
     def prompts(self):
         """
@@ -112,11 +239,20 @@ class Builder(object):
         """
         pass
 
+    def edits(self):
+        """
+        Abstract method that returns the confirmed insertions of the file as
+        a list of (lineno, text) pairs
+        """
+        return []
+
     def apply(self):
         """
-        Abstract method to changes on the file
+        Applies all the confirmed changes on the file with a single write
         """
-        pass
+        insertions = self.edits()
+        if insertions:
+            self.source.apply_insertions(insertions)
 
 
 class FilesDirector:
@@ -131,21 +267,50 @@ class FilesDirector:
         ----------
         list files: list of pre-given files
         """
+        self.prepare_rules()
         self.set_files_to_read(files=files)
         self.apply_includes()
         self.apply_excludes()
 
+    def prepare_rules(self):
+        """
+        Compiles the `include` and `exclude` config into path rules
+        """
+        self.include_rules = PathRules(self.config.get("include"))
+        self.exclude_rules = PathRules(self.config.get("exclude"))
+
     def apply_includes(self):
         """
-        TODO function that applies includes config
+        Keeps only the files that match the `include` config, when given
         """
-        pass
+        if not self.include_rules:
+            return
+        self.file_list = [
+            filename
+            for filename in self.file_list
+            if self.include_rules.match_tree(self._relative(filename))
+        ]
 
     def apply_excludes(self):
         """
-        TODO Method for removing files from a file list
+        Method for removing files that match the `exclude` config from a file list
         """
-        pass
+        if not self.exclude_rules:
+            return
+        self.file_list = [
+            filename
+            for filename in self.file_list
+            if not self.exclude_rules.match_tree(self._relative(filename))
+        ]
+
+    def _relative(self, filename):
+        """
+        Path of a file relative to the root of the project
+        Parameters
+        ----------
+        str filename: The file's name
+        """
+        return os.path.relpath(os.path.abspath(filename), os.getcwd())
 
     def set_files_to_read(self, files=[]):
         """
@@ -163,12 +328,35 @@ class FilesDirector:
             self.file_list = files
             return
 
+        discovery = self.config.get("discovery") or {}
+        if discovery.get("source") == "git":
+            result = self._git_files(untracked=discovery.get("untracked", True))
+            if result is not None:
+                self.file_list = result
+                return
+
         result = []
-        for paths in all_files_generator(extensions=self.extensions):
+        for paths in all_files_generator(
+            extensions=self.extensions, excludes=self.exclude_rules
+        ):
             result += paths
 
         self.file_list = result
 
+    def _git_files(self, untracked=True):
+        """
+        Candidate files from the git index. It returns None outside of a
+        repository, so that the caller falls back to walking the file system
+        Parameters
+        ----------
+        bool untracked: Also list untracked files that are not ignored
+        """
+        try:
+            repo = git.Repo(os.getcwd(), search_parent_directories=True)
+            return git_files(repo, extensions=self.extensions, untracked=untracked)
+        except (git.InvalidGitRepositoryError, git.NoSuchPathError, git.CommandError):
+            return None
+
 
 class FormatsDirector:
 
@@ -0,0 +1,241 @@
+"""
+Persistent caches kept under `.dyc/cache` at the root of a project.
+
+The scan cache remembers the candidates found in every file together with
+the identity of the file (mtime, size and content hash) and the format
+config it was scanned with. An unchanged file that was fully documented
+is then skipped at the cost of a single `stat()`.
+
+The diff cache remembers the uncommitted changes parsed by `dyc diff`
+for a state of the repository, so that running it again on an unchanged
+tree does not diff again.
+"""
+
+import os
+import json
+import time
+import hashlib
+from .scanner import open_source
+
+
+def fingerprint(value):
+    """
+    Stable hash of a config value, used to invalidate cache entries
+    when the config they were computed with changes
+    Parameters
+    ----------
+    dict value: Any JSON serializable config
+    """
+    dumped = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha1(dumped.encode("utf-8")).hexdigest()
+
+
+def write_json(path, data):
+    """
+    Writes JSON data to a file through a temporary file, so that readers
+    never see a partially written cache
+    Parameters
+    ----------
+    str path: Destination file
+    dict data: JSON serializable data
+    """
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+        # Keep the cache out of version control, like pytest does
+        with open(os.path.join(directory, ".gitignore"), "w") as stream:
+            stream.write("*\n")
+    temporary = "{}.{}.tmp".format(path, os.getpid())
+    with open(temporary, "w") as stream:
+        json.dump(data, stream)
+    if hasattr(os, "replace"):
+        os.replace(temporary, path)
+    else:
+        os.rename(temporary, path)
+
+
+def read_json(path):
+    """
+    Reads a JSON cache file, None if it is missing or corrupt
+    Parameters
+    ----------
+    str path: Cache file
+    """
+    try:
+        with open(path, "r") as stream:
+            return json.load(stream)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+class JsonCache(object):
+    """
+    On-disk cache of JSON entries. Entries are evicted least recently
+    used first once there are more than `max_entries`
+    """
+
+    VERSION = 1
+    NAME = None
+
+    def __init__(self, directory, max_entries=20000):
+        self.path = os.path.join(directory, self.NAME)
+        self.max_entries = max_entries
+        self.entries = dict()
+        self.clock = 0
+        self.dirty = False
+        self.load()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Creates the cache from the `cache` config, None if it is disabled
+        Parameters
+        ----------
+        dict config: The plain dyc config
+        """
+        cnf = config.get("cache") or {}
+        if not cnf.get("enabled"):
+            return None
+        return cls(
+            os.path.join(os.getcwd(), cnf.get("path", ".dyc/cache")),
+            max_entries=cnf.get("max_entries", 20000),
+        )
+
+    def load(self):
+        """
+        Loads the cache file, dropping it if it was written by another version
+        """
+        data = read_json(self.path)
+        if not data or data.get("version") != self.VERSION:
+            return
+        self.entries = data.get("entries", {})
+        self.clock = data.get("clock", 0)
+
+    def save(self):
+        """
+        Evicts the least recently used entries above the cap and writes
+        the cache back if anything changed
+        """
+        if not self.dirty:
+            return
+        if len(self.entries) > self.max_entries:
+            ordered = sorted(self.entries, key=lambda key: self.entries[key]["used"])
+            for key in ordered[: len(self.entries) - self.max_entries]:
+                del self.entries[key]
+        write_json(
+            self.path,
+            dict(version=self.VERSION, clock=self.clock, entries=self.entries),
+        )
+        self.dirty = False
+
+    def _touch(self, entry):
+        """
+        Marks an entry as the most recently used one
+        Parameters
+        ----------
+        dict entry: Cache entry
+        """
+        self.clock += 1
+        entry["used"] = self.clock
+        self.dirty = True
+
+
+class ScanCache(JsonCache):
+    """
+    Cache of scan results keyed by file path
+    """
+
+    NAME = "scan.json"
+    # Files modified this close to the moment they were scanned could have
+    # changed again within the mtime resolution, so their hash is verified
+    RACY_SECONDS = 2
+
+    def lookup(self, filename, config):
+        """
+        Returns the cached candidates of a file, or None when the file or
+        its config changed since it was scanned
+        Parameters
+        ----------
+        str filename: The file's name
+        str config: Fingerprint of the file's format config
+        """
+        entry = self.entries.get(os.path.abspath(filename))
+        if not entry or entry.get("config") != config:
+            return None
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+        if stat.st_size != entry.get("size"):
+            return None
+        racy = entry.get("mtime") >= entry.get("scanned") - self.RACY_SECONDS
+        if stat.st_mtime != entry.get("mtime") or racy:
+            if open_source(filename).digest() != entry.get("digest"):
+                return None
+            entry["mtime"] = stat.st_mtime
+            entry["scanned"] = time.time()
+        self._touch(entry)
+        return entry.get("candidates")
+
+    def store(self, filename, config, identity, candidates):
+        """
+        Stores the scan result of a file
+        Parameters
+        ----------
+        str filename: The file's name
+        str config: Fingerprint of the file's format config
+        tuple identity: (mtime, size, digest) of the file when it was read
+        list candidates: Summaries of the candidates found in the file
+        """
+        mtime, size, digest = identity
+        entry = dict(
+            config=config,
+            mtime=mtime,
+            size=size,
+            digest=digest,
+            scanned=time.time(),
+            candidates=candidates,
+        )
+        self.entries[os.path.abspath(filename)] = entry
+        self._touch(entry)
+
+
+class DiffCache(JsonCache):
+    """
+    Cache of the uncommitted changes of a repository keyed by its state,
+    see `Diff.state`. Only a few states are kept since any commit, stage
+    or edit moves to a new one
+    """
+
+    NAME = "diff.json"
+    MAX_ENTRIES = 16
+
+    def __init__(self, directory, max_entries=MAX_ENTRIES):
+        super(DiffCache, self).__init__(
+            directory, max_entries=min(max_entries, self.MAX_ENTRIES)
+        )
+
+    def lookup(self, state):
+        """
+        Returns the changes cached for a state, None if there are none
+        Parameters
+        ----------
+        str state: Key of the state of the repository
+        """
+        entry = self.entries.get(state)
+        if not entry:
+            return None
+        self._touch(entry)
+        return entry.get("changes")
+
+    def store(self, state, changes):
+        """
+        Stores the changes of a state
+        Parameters
+        ----------
+        str state: Key of the state of the repository
+        list changes: JSON serializable changes
+        """
+        entry = dict(changes=changes)
+        self.entries[state] = entry
+        self._touch(entry)
@@ -1,6 +1,4 @@
 import sys
-import fileinput
-import linecache
 import click
 import os
 import re
@@ -14,49 +12,50 @@ from .utils import (
     get_indent,
 )
 from .base import Builder
+from .scanner import Candidate
 
 
 class ClassBuilder(Builder):
-    already_printed_filepaths = []  # list of already printed files
-
-    def validate(self, result):
+    def is_candidate(self, result):
         """
-        An abstract validator method that checks if the class is
-        still valid and gives the final decision
+        A predicate that checks if the extracted class is not ignored
+        and still misses a docstring
         Parameters
         ----------
-        ClassInterface result: The Class Interface result
+        Candidate result: A candidate class
         """
         if not result:
             return False
-        name = result.name
-        if name not in self.config.get(
+        return result.name not in self.config.get(
             "ignore", []
-        ) and not self.is_first_line_documented(result):
-            if (
-                self.filename not in self.already_printed_filepaths
-            ):  # Print file of class to document
-                click.echo(
-                    "\n\nIn file {} :\n".format(
-                        click.style(
-                            os.path.join(*self.filename.split(os.sep)[-3:]), fg="red"
-                        )
+        ) and not self.is_first_line_documented(result)
+
+    def confirm(self, result):
+        """
+        Asks the user to confirm documenting a candidate class
+        Parameters
+        ----------
+        Candidate result: A candidate class
+        """
+        if self.filename not in self.state.printed:  # Print file of class to document
+            click.echo(
+                "\n\nIn file {} :\n".format(
+                    click.style(
+                        os.path.join(*self.filename.split(os.sep)[-3:]), fg="red"
                     )
                 )
-                self.already_printed_filepaths.append(self.filename)
-            confirmed = (
-                True
-                if self.placeholders
-                else click.confirm(
-                    "Do you want to document class {}?".format(
-                        click.style(name, fg="green")
-                    )
+            )
+            self.state.printed.add(self.filename)
+        confirmed = (
+            True
+            if self.placeholders
+            else click.confirm(
+                "Do you want to document class {}?".format(
+                    click.style(result.name, fg="green")
                 )
             )
-            if confirmed:
-                return True
-
-        return False
+        )
+        return bool(confirmed)
 
     def is_first_line_documented(self, result):
         """
@@ -70,8 +69,8 @@ class ClassBuilder(Builder):
         """
         returned = False
         # copied from pull request related to issue #63
-        read_first_line = linecache.getline(result.filename, result.start)
-        read_second_line = linecache.getline(result.filename, result.start + 1)
+        read_first_line = self.source.line(result.start)
+        read_second_line = self.source.line(result.start + 1)
         finalTwoLines = read_first_line + "\n" + read_second_line
         # The open_brace_pattern is """ by default, but can be configured in the yml files
         open_brace_pattern = self.config.get("open", None)
@@ -80,8 +79,6 @@ class ClassBuilder(Builder):
         #:\n\s{4}(?:""")   #r':[\s\S]?[\n][\s]*(""")'
         match = re.search(pattern, finalTwoLines)
         returned = True if match else False
-
-        linecache.clearcache()
         return returned
 
     def extract_and_set_information(self, filename, start, line, length):
@@ -99,48 +96,48 @@ class ClassBuilder(Builder):
         # ------------------------------#
         # CAN GENERALIZE THIS FUNCTION #
         # ------------------------------#
-        start_line = linecache.getline(filename, start)
+        start_line = self.source.line(start)
         initial_line = line
         start_leading_space = get_leading_whitespace(
             start_line
         )  # Where function started
-        class_string = start_line
         if not is_one_line_method(start_line, self.config.get("keywords")):
-            class_string = line
-            linesBackwards = class_string.count("\n") - 1
+            linesBackwards = line.count("\n") - 1
             start_leading_space = get_leading_whitespace(
-                linecache.getline(filename, start - linesBackwards)
+                self.source.line(start - linesBackwards)
             )
-        line_within_scope = True
-        lineno = start + 1
-        line = linecache.getline(filename, lineno)
-        end_of_file = False
-        end = None
-        while line_within_scope and not end_of_file:
-            current_leading_space = get_leading_whitespace(line)
-            if len(current_leading_space) <= len(start_leading_space) and line.strip():
-                end = lineno - 1
-                break
-            class_string += line
-            lineno = lineno + 1
-            line = linecache.getline(filename, int(lineno))
-            end_of_file = True if lineno > length else False
-
-        if not end:
-            end = length
-
-        linecache.clearcache()
-        return ClassInterface(
-            plain=class_string,
+        end = self.source.scopes.end(start, len(start_leading_space))
+
+        return Candidate(
             name=self._get_name(initial_line),
             start=start,
             end=end,
-            filename=filename,
-            classes=self.extract_classes(initial_line.strip("\n")),
+            decl_start=start - max(initial_line.count("\n") - 1, 0),
+            indent=get_leading_whitespace(initial_line),
+            arguments=self.extract_classes(initial_line.strip("\n")),
+        )
+
+    def interface(self, candidate):
+        """
+        Builds the interface of a confirmed candidate. Its body is read
+        from the shared source buffer only if the editor needs it
+        Parameters
+        ----------
+        Candidate candidate: A confirmed candidate
+        """
+        return ClassInterface(
+            plain=None,
+            name=candidate.name,
+            start=candidate.start,
+            end=candidate.end,
+            filename=self.filename,
+            classes=candidate.arguments,
             config=self.config,
-            leading_space=get_leading_whitespace(initial_line),
+            leading_space=candidate.indent,
             placeholders=self.placeholders,
             skip_confirm=self.skip_confirm,
+            decl_start=candidate.decl_start,
+            source=self.source,
         )
 
     def extract_classes(self, line):
@@ -172,40 +169,20 @@ class ClassBuilder(Builder):
             for class_interface in func_pack.values():
                 yield class_interface
 
-    def apply(self):
+    def edits(self):
         """
         Over here we are looping over the result of the
-        chosen classes to document and applying the changes to the
-        files as confirmed
+        chosen classes to document and collecting the insertions
+        to apply on the file as confirmed
         """
-        for class_interface in self._class_interface_gen():
-            if not class_interface:
-                continue
-            fileInput = fileinput.input(class_interface.filename, inplace=True)
-
-            for line in fileInput:
-                tmpLine = line
-                if self._is_class(line) and ":" not in line:
-                    openedP = line.count("(")
-                    closedP = line.count(")")
-                    pos = 1
-                    if openedP == closedP:
-                        continue
-                    else:
-                        while openedP != closedP:
-                            tmpLine += fileInput.readline()
-                            openedP = tmpLine.count("(")
-                            closedP = tmpLine.count(")")
-                            pos += 1
-                        line = tmpLine
-
-                if self._get_name(line) == class_interface.name:
-                    if self.config.get("within_scope"):
-                        sys.stdout.write(line + class_interface.result + "\n")
-                    else:
-                        sys.stdout.write(class_interface.result + "\n" + line)
-                else:
-                    sys.stdout.write(line)
+        result = []
+        for class_interface in self.details.get(self.filename, {}).values():
+            if self.config.get("within_scope"):
+                lineno = class_interface.start + 1
+            else:
+                lineno = class_interface.decl_start
+            result.append((lineno, class_interface.result + "\n"))
+        return result
 
     def _get_name(self, line):
         """
@@ -438,8 +415,11 @@ class ClassInterface(ClassFormatter):
         leading_space,
         placeholders,
         skip_confirm,
+        decl_start=None,
+        source=None,
     ):
-        self.plain = plain
+        self._plain = plain
+        self.source = source
         self.name = name
         self.start = start
         self.end = end
@@ -451,6 +431,16 @@ class ClassInterface(ClassFormatter):
         self.leading_space = leading_space
         self.placeholders = placeholders
         self.skip_confirm = skip_confirm
+        self.decl_start = start if decl_start is None else decl_start
+
+    @property
+    def plain(self):
+        """
+        Source of the class, read from the source buffer on first access
+        """
+        if self._plain is None and self.source is not None:
+            self._plain = self.source.text(self.decl_start, self.end)
+        return self._plain
 
     def prompt(self):
         self._prompt_docstring()
@@ -8,144 +8,208 @@ The file will patch will undergo the process of:
 """
 import os
 import git
+import codecs
 import ntpath
-from .utils import get_hunk, get_additions_in_first_hunk
+import binascii
+from .utils import get_hunk, get_additions_in_first_hunk, get_extension
 from .base import Processor
+from .cache import DiffCache, fingerprint
 
 
 class DiffParser:
 
     PREFIX = "diff --git"
 
-    def parse(self, staged=False):
+    @property
+    def pathspecs(self):
+        """
+        Git pathspecs that limit a diff to the candidate extensions
         """
-        Main parser method that gets all the mandatory information from
-        a Diff chunk
+        return ["*.{}".format(extension) for extension in self.extensions]
+
+    def _pathspecs(self, paths=None):
+        """
+        Pathspecs of the given paths, taken literally, or of the candidate
+        extensions when no path is given
         Parameters
         ----------
-        bool staged: Only using the staged files
+        list paths: Paths relative to the root of the repository
         """
-        self.diffs = self.repo.index.diff("HEAD" if staged else None)
-        self.plain = self.repo.git.diff("HEAD").split("\n")
-        return self._pack()
+        if paths:
+            return [":(literal){}".format(path) for path in paths]
+        return self.pathspecs
 
-    def _pack(self):
+    def _separator(self, diff):
         """
-        Wrapper that packs the information that'll be parsed
+        The `diff --git` line that starts the section of a file
+        Parameters
+        ----------
+        git.Diff diff: Diff of a file from the index
         """
-        patches = []
-        for diff in self.diffs:
-            if not self.is_candidate(diff.a_path):
-                print("File {} is not a candidate to apply DYC".format(diff.a_path))
-                continue
-            sep = "{} a/{} b/{}".format(self.PREFIX, diff.a_path, diff.b_path)
-            patch = self.__clean(self.__patch(sep), diff)
-            patches.append(patch)
-        return patches
+        return "{} a/{} b/{}".format(self.PREFIX, diff.a_path, diff.b_path)
 
-    def is_candidate(self, path):
+    def _wanted(self, diffs):
         """
-        Check if a file is a candidate to being documented
-        after looking at the allowed files from file_list
+        Separators of the candidate files among some index diffs
         Parameters
         ----------
-        str path: path of a file
+        list diffs: Diffs of files from the index
         """
-        full_path = os.path.join(os.getcwd(), path)
-        return full_path in self.file_list
+        return set(
+            self._separator(diff) for diff in diffs if self.is_candidate(diff.a_path)
+        )
 
-    def __patch(self, separator):
+    def _sections(self, paths=None, wanted=None, headers=None):
         """
-        A method that returns a patch
+        Runs `git diff HEAD` once, limited to the candidate extensions or
+        to the given paths and without context lines since only the added
+        lines are used. Its output is read from the pipe and split per file
+        as it streams, so it is never held in memory as a whole
         Parameters
         ----------
-        str separator: Main separators from a diff chunk
-        """
-        patch = []
-        hit = False
-        # end = False
-        for line in self.plain:
-            if line == separator:
-                hit = True
-                continue
-            elif line.startswith(self.PREFIX) and hit:
-                break
-            elif hit:
-                patch.append(line)
-        return "\n".join(patch)
+        list paths: Limit the diff to these paths
+        set wanted: Separators of the files to keep, all of them when None
+        dict headers: Filled with the headers of the kept files, see `_split`
+        """
+        args = ["HEAD", "--unified=0"]
+        pathspecs = self._pathspecs(paths)
+        if pathspecs:
+            args += ["--"] + pathspecs
+        process = self.repo.git.diff(*args, as_process=True)
+        sections = self._split(
+            self._lines(process.stdout), wanted=wanted, headers=headers
+        )
+        process.wait()
+        return sections
 
-    def __pack(self, patch):
+    def _lines(self, stream):
         """
-        Packer to get from the chunk of diffs and attach
-        to additions
+        Decodes the lines of a diff read from a pipe
         Parameters
         ----------
-        str patch: Patched diff text
+        file stream: Output of `git diff`
         """
-        final = []
-        result = []
-        hit = False
-        start, end = None, None
-        for index, line in enumerate(patch):
-            _hunk = get_hunk(line)
-
-            if (len(patch) - 1) == index:
-                final.append(dict(patch="\n".join(result), hunk=(start, end)))
+        for line in stream:
+            line = line.decode("utf-8", "replace")
+            yield line[:-1] if line.endswith("\n") else line
 
-            if len(_hunk) and not hit:
-                start, end = get_additions_in_first_hunk(get_hunk(line))
-                hit = True
+    def _split(self, plain, wanted=None, headers=None):
+        """
+        Splits the lines of a diff into the added hunks of every file in a
+        single pass, indexed by their `diff --git` separator line. Only the
+        added lines of a hunk are kept. Hunks that only remove lines and
+        files that are not wanted are dropped as soon as they are read
+        Parameters
+        ----------
+        iterable plain: Lines of the diff
+        set wanted: Separators of the files to keep, all of them when None
+        dict headers: Filled with the path every kept file has after the diff
+        and whether the diff creates it, by separator
+        """
+        sections = dict()
+        hunks = None
+        hunk = None
+        header = None
+        added = []
+        for line in plain:
+            if line.startswith(self.PREFIX) or line.startswith("@@"):
+                if hunk is not None:
+                    hunk["patch"] = "\n".join(added)
+                    hunks.append(hunk)
+                hunk = None
+                added = []
+            if line.startswith(self.PREFIX):
+                keep = wanted is None or line in wanted
+                hunks = sections.setdefault(line, []) if keep else None
+                header = dict(path=None, new=False) if keep else None
+                if header is not None and headers is not None:
+                    headers[line] = header
+            elif hunks is None:
                 continue
-            elif len(_hunk) and hit:
-                final.append(dict(patch="\n".join(result), hunk=(start, end)))
+            elif header is not None and line.startswith("new file mode"):
+                header["new"] = True
+            elif header is not None and line.startswith("+++ "):
+                header["path"] = self._target(line)
+            elif line.startswith("@@"):
+                header = None
                 start, end = get_additions_in_first_hunk(get_hunk(line))
-                result = []
-                hit = True
-            elif hit:
-                result.append(line)
-
-        return final
-
-    def __clean(self, patch, diff):
-        """Returns a clean dict of a path"""
-        result = {}
-        result["additions"] = self.__additions(
-            self.__pack(patch.split("\n")), diff.a_path
-        )  # [{hunk: (start, end), patch:}]
-        result["plain"] = patch
-        result["diff"] = diff
-        result["name"] = ntpath.basename(diff.a_path)
-        result["path"] = diff.a_path
-        return result
-
-    def __additions(self, hunks, path):
-        """
-        Function that returns only the added text in a file
+                if start and end > start:
+                    hunk = dict(hunk=[start, end])
+            elif hunk is not None and line.startswith("+"):
+                added.append(line[1:])
+        if hunk is not None:
+            hunk["patch"] = "\n".join(added)
+            hunks.append(hunk)
+        return sections
+
+    def _target(self, line):
+        """
+        Path of a file from the `+++ b/` line of its diff. Git quotes paths
+        with unusual characters C-style and ends those with spaces by a tab
+        Parameters
+        ----------
+        str line: The `+++` line of a file's diff
+        """
+        path = line[len("+++ ") :].rstrip("\t")
+        if path.startswith('"') and path.endswith('"'):
+            raw = path[1:-1].encode("latin-1", "backslashreplace")
+            path = codecs.escape_decode(raw)[0].decode("utf-8", "replace")
+        return path[len("b/") :] if path.startswith("b/") else path
+
+    def _pack(self, diffs, sections, headers):
+        """
+        Wrapper that packs the information that'll be parsed
+        Parameters
+        ----------
+        list diffs: Diffs of files from the index
+        dict sections: Added hunks of every file, see `_split`
+        dict headers: Headers of every file, see `_split`
+        """
+        patches = []
+        for diff in diffs:
+            if not self.is_candidate(diff.a_path):
+                print("File {} is not a candidate to apply DYC".format(diff.a_path))
+                continue
+            separator = self._separator(diff)
+            header = headers.get(separator) or {}
+            patches.append(
+                dict(
+                    additions=sections.get(separator, []),
+                    name=ntpath.basename(diff.a_path),
+                    path=diff.a_path,
+                    new=header.get("new", False),
+                )
+            )
+        return patches
+
+    def is_candidate(self, path):
+        """
+        Check if a file is a candidate to being documented from its
+        extension, the `include` and `exclude` rules and, when the config
+        lists the files to document, a lookup in that list
         Parameters
         ----------
-        list hunks: Group of added texts
         str path: path of a file
         """
-        for hunk in hunks:
-            patch = hunk.get("patch")
-            result = []
-            for line in patch.split("\n"):
-                try:
-                    if line[0] == "+" and not line.startswith("+++"):
-                        l = line[1:]
-                        result.append(l)
-                except IndexError as e:
-                    print(e.message)
-                    continue
-            hunk["patch"] = "\n".join(result)
-        return hunks
+        if get_extension(path) not in self.candidate_extensions:
+            return False
+        relative = self._relative(path)
+        if self.include_rules and not self.include_rules.match_tree(relative):
+            return False
+        if self.exclude_rules and self.exclude_rules.match_tree(relative):
+            return False
+        return self.listed is None or os.path.abspath(path) in self.listed
 
 
 class Diff(DiffParser, Processor):
-    def __init__(self, config):
-        self.repo = git.Repo(os.getcwd())
+    def __init__(self, config, repo=None):
+        self.repo = repo or git.Repo(os.getcwd())
         self.config = config
-        self.prepare()
+        # Candidacy is decided per changed path, the tree is never walked
+        self.prepare_rules()
+        self.candidate_extensions = set(self.extensions)
+        file_list = config.get("file_list")
+        self.listed = set(map(os.path.abspath, file_list)) if file_list else None
 
     @property
     def uncommitted(self):
@@ -154,9 +218,133 @@ class Diff(DiffParser, Processor):
         """
         return self._uncommitted()
 
-    def _uncommitted(self):
+    def uncommitted_for(self, paths):
+        """
+        Uncommitted information of some paths only. The diffs are limited to
+        these paths, so the cost depends on their size, not the repository's
+        Parameters
+        ----------
+        list paths: Paths relative to the root of the repository
+        """
+        return self._uncommitted(paths=paths)
+
+    def between(self, since=None, revisions=None):
+        """
+        Information of everything added by a range of commits, in the same
+        form as `uncommitted`. `since` diffs the working tree against its
+        merge base with HEAD, i.e all the changes of a branch, and
+        `revisions` is a range like `a..b`. The whole range is diffed by a
+        single `git diff`, so the cost depends on the size of the change
+        Parameters
+        ----------
+        str since: Revision the current branch started from
+        str revisions: Range of commits, `a..b` or `a...b`
+        """
+        if since:
+            revisions = self.repo.git.merge_base(since, "HEAD")
+        # The prefixes are given since the user's config could change them
+        args = [revisions, "--unified=0", "--diff-filter=d"]
+        args += ["--src-prefix=a/", "--dst-prefix=b/", "--"] + self.pathspecs
+        process = self.repo.git.diff(*args, as_process=True)
+        headers = dict()
+        sections = self._split(self._lines(process.stdout), headers=headers)
+        process.wait()
+
+        changes = []
+        for separator, header in sorted(
+            headers.items(), key=lambda item: item[1]["path"] or ""
+        ):
+            path = header["path"]
+            if path and self.is_candidate(path):
+                changes.append(
+                    dict(
+                        additions=sections.get(separator, []),
+                        name=ntpath.basename(path),
+                        path=path,
+                        new=header["new"],
+                    )
+                )
+        return changes
+
+    def _uncommitted(self, paths=None):
         """
         Private method to return the data for the publish uncommitted
-        property
+        property. The result is cached per state of the repository, see
+        `state`, so running it again on an unchanged tree does not diff
+        Parameters
+        ----------
+        list paths: Limit the diff to these paths
+        """
+        cache = DiffCache.from_config(self.config)
+        if cache:
+            state = self.state(paths)
+            changes = cache.lookup(state)
+            if changes is not None:
+                cache.save()
+                return changes
+
+        pathspecs = self._pathspecs(paths) or None
+        unstaged = self.repo.index.diff(None, paths=pathspecs)
+        staged = self.repo.index.diff("HEAD", paths=pathspecs)
+        headers = dict()
+        sections = self._sections(
+            paths, wanted=self._wanted(unstaged + staged), headers=headers
+        )
+        changes = self._pack(unstaged, sections, headers)
+        changes += self._pack(staged, sections, headers)
+
+        if cache:
+            cache.store(state, changes)
+            cache.save()
+        return changes
+
+    def state(self, paths=None):
+        """
+        Key of the uncommitted state of the repository: the HEAD commit, the
+        checksum of the index, which covers staged changes, and the stat of
+        the files that differ from the index, which covers the rest. Only
+        `git update-index --refresh` and `git diff-files` run, which compare
+        stat data and read no unchanged content. The config and the paths
+        are part of the key too
+        Parameters
+        ----------
+        list paths: Limit the diff to these paths
         """
-        return self.parse() + self.parse(staged=True)
+        # Diffing refreshes stale stat data in the index and rewrites it, so
+        # refresh first, like `git status` does, to get the same key after
+        try:
+            self.repo.git.update_index("-q", "--refresh")
+        except git.exc.GitCommandError:
+            # Exits with an error when files need updating, which is fine
+            pass
+
+        try:
+            head = self.repo.head.commit.hexsha
+        except ValueError:
+            # No commit yet
+            head = None
+
+        # The index ends with the SHA-1 checksum of its content. Its mtime is
+        # left out since git rewrites it with the same content on a refresh
+        try:
+            with open(os.path.join(self.repo.git_dir, "index"), "rb") as stream:
+                stream.seek(-20, os.SEEK_END)
+                index = binascii.hexlify(stream.read()).decode("ascii")
+        except (IOError, OSError):
+            index = None
+
+        args = ["--name-only", "-z"]
+        pathspecs = self._pathspecs(paths)
+        if pathspecs:
+            args += ["--"] + pathspecs
+        dirty = []
+        for path in sorted(filter(None, self.repo.git.diff_files(*args).split("\0"))):
+            try:
+                stat = os.stat(os.path.join(self.repo.working_tree_dir, path))
+                dirty.append([path, stat.st_mtime, stat.st_size])
+            except OSError:
+                dirty.append([path, None, None])
+
+        return fingerprint(
+            dict(head=head, index=index, dirty=dirty, paths=paths, config=self.config)
+        )
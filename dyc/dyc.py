@@ -2,11 +2,13 @@
 This file gets configuration from parser.ParsedConfig
 and handles all the commands from the command line.
 """
+import git
 import click
 from .parser import ParsedConfig
 from .main import DYC
 from .diff import Diff
 from .events import Watcher
+from .utils import git_error_message
 import sys
 import time
 import logging
@@ -35,8 +37,15 @@ def main(config):
 @click.option("--placeholders", is_flag=True, default=False)
 @click.argument("files", nargs=-1, type=click.Path(exists=True), required=False)
 @click.option("--skip-confirm", required=False, default=False, is_flag=True)
+@click.option(
+    "--jobs",
+    "-j",
+    type=int,
+    default=0,
+    help="Number of processes scanning files. Defaults to one per CPU",
+)
 @config
-def start(config, files, placeholders, skip_confirm):
+def start(config, files, placeholders, skip_confirm, jobs):
     """
     This is the entry point of starting DYC for the whole project.
     When you run `dyc start`. ParsedConfig will wrap all the
@@ -45,29 +54,53 @@ def start(config, files, placeholders, skip_confirm):
     """
     if files:
         config.plain["file_list"] = list(files)
-    dyc = DYC(config.plain, placeholders=placeholders, skip_confirm=skip_confirm)
+    dyc = DYC(
+        config.plain, placeholders=placeholders, skip_confirm=skip_confirm, jobs=jobs
+    )
     dyc.prepare()
-    dyc.process_methods()
-    dyc.process_top()
-    dyc.process_classes()
+    dyc.process()
 
 
 @main.command()
 @click.option(
     "--watch", help="Add default placeholder when watching", is_flag=True, default=False
 )
+@click.option(
+    "--since",
+    help="Document what the current branch added since it forked from a revision",
+    required=False,
+)
+@click.option(
+    "--range",
+    "revisions",
+    help="Document what a range of commits added, i.e `a..b`",
+    required=False,
+)
 @config
-def diff(config, watch):
+def diff(config, watch, since, revisions):
     """
     This argument will run DYC on DIFF patch only
     """
+    if watch and (since or revisions):
+        raise click.UsageError("--watch cannot be used with --since or --range")
+    if since and revisions:
+        raise click.UsageError("--since and --range cannot be used together")
     if watch:
         Watcher.start(config)
     else:
         diff = Diff(config.plain)
-        uncommitted = diff.uncommitted
-        paths = [idx.get("path") for idx in uncommitted]
-        if len(uncommitted):
+        if since or revisions:
+            try:
+                changes = diff.between(since=since, revisions=revisions)
+            except git.exc.GitCommandError as error:
+                raise click.BadParameter(
+                    git_error_message(error),
+                    param_hint="--since" if since else "--range",
+                )
+        else:
+            changes = diff.uncommitted
+        paths = [idx.get("path") for idx in changes]
+        if len(changes):
             dyc = DYC(config.plain)
             dyc.prepare(files=paths)
-            dyc.process_methods(diff_only=True, changes=uncommitted)
+            dyc.process(changes=changes)
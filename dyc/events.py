@@ -3,43 +3,233 @@ This file contains all the event classes used in dyc. It contains
 a Watcher that watches files for changes and a WatchEvent that
 triggers if a file is changed.
 """
+import os
 import sys
 import time
 import logging
+import threading
 from watchdog.observers import Observer
 from watchdog.events import LoggingEventHandler
 from .diff import Diff
 from .main import DYC
+from .parser import ParsedConfig
+from .configs import CUSTOM
+from .scanner import open_source
+
+
+class EventQueue(object):
+    """
+    Coalesces bursts of events per path. A path is handed out once no
+    event touched it for `debounce` seconds
+    """
+
+    def __init__(self, debounce=0.5):
+        self.debounce = debounce
+        self.pending = dict()
+        self.condition = threading.Condition()
+        self.closed = False
+
+    def push(self, path):
+        """
+        Queues a path, or postpones it if it is already waiting
+        Parameters
+        ----------
+        str path: Path of the changed file
+        """
+        with self.condition:
+            self.pending[path] = time.time() + self.debounce
+            self.condition.notify()
+
+    def pop(self):
+        """
+        Blocks until some paths settled and returns them sorted. Returns None
+        once the queue is closed
+        """
+        with self.condition:
+            while not self.closed:
+                now = time.time()
+                due = sorted(
+                    path for path, deadline in self.pending.items() if deadline <= now
+                )
+                if due:
+                    for path in due:
+                        del self.pending[path]
+                    return due
+                timeout = min(self.pending.values()) - now if self.pending else None
+                self.condition.wait(timeout)
+            return None
+
+    def close(self):
+        """
+        Wakes up and stops whoever waits on the queue
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
 
 
 class WatchEvent(LoggingEventHandler):
 
     config = None
 
+    def __init__(self, config):
+        super(WatchEvent, self).__init__()
+        self.config = config
+        # Built once and reused, so every event shares the same repository
+        self.diff = Diff(config.plain)
+        watch = config.plain.get("watch") or {}
+        self.queue = EventQueue(debounce=watch.get("debounce", 0.5))
+        # Content hash of every path as it was last processed or written
+        self.digests = dict()
+        self.config_path = self.relative(CUSTOM)
+        self.remember([self.config_path])
+
     def dispatch(self, event):
         """
-        Temporary dispatch method as a POC for logger.
-        Needs cleanup
+        Runs on the observer thread, so it only filters the event and queues
+        its path. The diff and the documentation run on the worker thread
         Parameters
         ----------
         FileModifiedEvent event: watchdog file of a modified event
         """
-        diff = Diff(self.config.plain)
-        uncommitted = diff.uncommitted
-        paths = [
-            idx.get("path")
-            for idx in uncommitted
-            if "./{}".format(idx.get("path")) == event.src_path
-        ]
-        filtered = [
-            idx
-            for idx in uncommitted
-            if "./{}".format(idx.get("path")) == event.src_path
-        ]
+        if event.is_directory:
+            return
+        for path in (event.src_path, getattr(event, "dest_path", None)):
+            relative = self.relative(path) if path else None
+            if relative == self.config_path or (
+                relative and self.is_candidate(relative)
+            ):
+                self.queue.push(relative)
+
+    def relative(self, path):
+        """
+        Path of an event relative to the root of the project, as git shows it
+        Parameters
+        ----------
+        str path: Path of an event
+        """
+        relative = os.path.relpath(os.path.abspath(path), os.getcwd())
+        return relative.replace(os.sep, "/")
+
+    def is_candidate(self, relative):
+        """
+        Checks if a changed path could need docstrings. Hidden paths like
+        `.git/` or editor swap files are ignored, the rest is up to the Diff
+        Parameters
+        ----------
+        str relative: Path relative to the root of the project
+        """
+        parts = relative.split("/")
+        if parts[0] == ".." or any(part.startswith(".") for part in parts):
+            return False
+        return self.diff.is_candidate(relative)
+
+    def work(self):
+        """
+        Worker thread loop that documents the queued paths until the
+        queue is closed
+        """
+        while True:
+            paths = self.queue.pop()
+            if paths is None:
+                return
+            paths = self.changed(paths)
+            if self.config_path in paths:
+                paths.remove(self.config_path)
+                try:
+                    self.reload()
+                except Exception:
+                    logging.exception("DYC could not reload %s", self.config_path)
+                finally:
+                    self.remember([self.config_path])
+            if not paths:
+                continue
+            try:
+                self.process(paths)
+            except Exception:
+                logging.exception("DYC failed on %s", ", ".join(paths))
+            finally:
+                # DYC's own writes must not trigger another run
+                self.remember(paths)
+
+    def reload(self):
+        """
+        Parses `dyc.yaml` again on the worker thread and swaps the new config
+        in for the next events. The new Diff, which holds the compiled rules
+        and extensions read by `dispatch`, is fully built before it replaces
+        the old one in a single assignment. A file that does not parse, i.e
+        in the middle of a save, keeps the previous config
+        """
+        config = ParsedConfig(reload=True)
+        if not config.valid:
+            logging.error(
+                "DYC could not parse %s, keeping the previous config", self.config_path
+            )
+            return
+        diff = Diff(config.plain, repo=self.diff.repo)
+        # Unchanged files may need documenting under the new config
+        self.digests = dict()
+        self.config = config
+        self.diff = diff
+        logging.info("Reloaded %s", self.config_path)
+
+    def digest(self, path):
+        """
+        Content hash of a file, None if it is gone
+        Parameters
+        ----------
+        str path: Path relative to the root of the project
+        """
+        try:
+            return open_source(path).digest()
+        except (IOError, OSError):
+            return None
+
+    def changed(self, paths):
+        """
+        Keeps the paths whose content changed since they were last seen.
+        Editors and formatters writing the same content again are ignored
+        Parameters
+        ----------
+        list paths: Paths relative to the root of the project
+        """
+        result = []
+        for path in paths:
+            digest = self.digest(path)
+            if digest is None:
+                self.digests.pop(path, None)
+            elif digest != self.digests.get(path):
+                result.append(path)
+        return result
+
+    def remember(self, paths):
+        """
+        Stores the current content hash of processed paths
+        Parameters
+        ----------
+        list paths: Paths relative to the root of the project
+        """
+        for path in paths:
+            digest = self.digest(path)
+            if digest is None:
+                self.digests.pop(path, None)
+            else:
+                self.digests[path] = digest
+
+    def process(self, paths):
+        """
+        Documents the uncommitted changes of a batch of settled paths. Only
+        these paths are diffed and scanned again
+        Parameters
+        ----------
+        list paths: Paths relative to the root of the project
+        """
+        uncommitted = self.diff.uncommitted_for(paths)
+        filtered = [idx for idx in uncommitted if idx.get("path") in paths]
         if len(filtered):
             dyc = DYC(self.config.plain, placeholders=True)
-            dyc.prepare(files=paths)
-            dyc.process_methods(diff_only=True, changes=uncommitted)
+            dyc.prepare(files=sorted(set(idx.get("path") for idx in filtered)))
+            dyc.process(changes=filtered)
 
 
 class Watcher:
@@ -55,8 +245,10 @@ class Watcher:
         """
         logging.basicConfig(level=logging.INFO)
         observer = Observer()
-        event_handler = WatchEvent()
-        event_handler.config = config
+        event_handler = WatchEvent(config)
+        worker = threading.Thread(target=event_handler.work)
+        worker.daemon = True
+        worker.start()
         observer.schedule(event_handler, ".", recursive=True)
         observer.start()
         try:
@@ -64,5 +256,7 @@ class Watcher:
                 time.sleep(1)
         except KeyboardInterrupt:
             observer.stop()
+            event_handler.queue.close()
             print("Quitting..")
         observer.join()
+        worker.join()
@@ -5,95 +5,254 @@ DYC (Document Your Code) Class initiator
 is constructed here. It performs all the readings
 
 """
-import click
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from .utils import get_extension
 from .methods import MethodBuilder
 from .top import TopBuilder
 from .classes import ClassBuilder
-from .base import Processor
+from .base import Processor, RunState
+from .scanner import open_source
+from .cache import ScanCache, fingerprint
+
+# Order in which the builders of a file run, prompt and insert
+KINDS = ("top", "method", "class")
+
+
+def create_builder(
+    kind,
+    filename,
+    fmt,
+    placeholders=False,
+    skip_confirm=False,
+    source=None,
+    state=None,
+):
+    """
+    Creates the builder of a kind for a file from its format
+    Parameters
+    ----------
+    str kind: One of KINDS
+    str filename: The file's name
+    dict fmt: Format config of the file's extension
+    bool placeholders: Use placeholders instead of prompting docstrings
+    bool skip_confirm: Skip the editor confirmation
+    SourceBuffer source: Already read buffer of the file
+    RunState state: State shared by the builders of the run
+    """
+    if kind == "method":
+        cnf = dict(
+            fmt.get("method", {}),
+            arguments=fmt.get("arguments"),
+            scanner=fmt.get("scanner"),
+            argument_names=fmt.get("argument_names"),
+        )
+        builder_class = MethodBuilder
+    elif kind == "class":
+        cnf = dict(
+            fmt.get("class", {}), parents=fmt.get("parents"), scanner=fmt.get("scanner")
+        )
+        builder_class = ClassBuilder
+    else:
+        cnf = fmt.get("top", {})
+        builder_class = TopBuilder
+    return builder_class(
+        filename,
+        cnf,
+        placeholders=placeholders,
+        skip_confirm=skip_confirm,
+        source=source,
+        state=state,
+    )
+
+
+def scan_file(task):
+    """
+    Scans a file once for the candidates of every builder kind. It does not
+    prompt, so it runs the same in a worker process. Returns the candidates,
+    the (mtime, size, digest) identity of the file as it was read and the
+    source buffer, which is only kept when asked for to avoid pickling file
+    contents back
+    Parameters
+    ----------
+    tuple task: (filename, fmt, change, placeholders, skip_confirm, keep_source)
+    """
+    filename, fmt, change, placeholders, skip_confirm, keep_source = task
+    source = open_source(filename)
+    candidates = [
+        create_builder(
+            kind, filename, fmt, placeholders, skip_confirm, source=source
+        ).scan(change=change)
+        for kind in KINDS
+    ]
+    identity = (source.stat.st_mtime, source.stat.st_size, source.digest())
+    return candidates, identity, source if keep_source else None
+
+
+def summarize(candidates):
+    """
+    JSON friendly summary of the candidates of a file, stored in the scan cache
+    Parameters
+    ----------
+    list candidates: Candidates of every kind, in the order of KINDS
+    """
+    return [
+        [kind, getattr(candidate, "name", None), getattr(candidate, "start", 1)]
+        for kind, found in zip(KINDS, candidates)
+        for candidate in found
+    ]
+
+
+def file_size(filename):
+    """
+    Size of a file used to weight the scanning work, 0 if it is unknown
+    Parameters
+    ----------
+    str filename: The file's name
+    """
+    try:
+        return os.path.getsize(filename)
+    except OSError:
+        return 0
 
 
 class DYC(Processor):
-    def __init__(self, config, details=None, placeholders=False, skip_confirm=False):
+    def __init__(
+        self, config, details=None, placeholders=False, skip_confirm=False, jobs=1
+    ):
         self.config = config
         self.placeholders = placeholders
         self.skip_confirm = skip_confirm
+        self.jobs = jobs
+        self.state = RunState()
 
-    def process_methods(self, diff_only=False, changes=[]):
+    def process(self, changes=[]):
         """
-        Main method that documents methods in a file. To any
-        file that needs to be documented. Process methods is the
-        entry point for getting the whole thing done
+        Main method that documents methods, the top and classes of every
+        file in one go. Each file is scanned once and all of its confirmed
+        docstrings are written at once, so no pass rescans lines shifted
+        by another one
         Parameters
         ----------
-        bool diff_only: Use a diff only. Consumed by dyc diff.
         list changes: Changes in a file, mainly use also with dyc diff.
         """
-        print("\nProcessing Methods\n\r")
-        for filename in self.file_list:
-
-            try:
-                change = list(filter(lambda x: x.get("path") == filename, changes))[0]
-            except TypeError as e:
-                click.echo(
-                    click.style("Error %r: USING default settings" % e, fg="red")
-                )
-                return
-            except IndexError:
-                change = None
+        print("\nProcessing Files\n\r")
+        for filename, candidates, source in self.scan(changes=changes):
+            if not any(candidates):
+                continue
+            source = source or open_source(filename)
+            insertions = []
+            for kind, found in zip(KINDS, candidates):
+                builder = self._builder(kind, filename, source=source)
+                builder.initialize(candidates=found)
+                builder.prompts()
+                insertions += builder.edits()
+                builder.clear(filename)
+            if insertions:
+                source.apply_insertions(insertions)
 
-            extension = get_extension(filename)
-            fmt = self.formats.get(extension)
-            method_cnf = fmt.get("method", {})
-            method_cnf["arguments"] = fmt.get("arguments")
-            builder = MethodBuilder(
-                filename,
-                method_cnf,
-                placeholders=self.placeholders,
-                skip_confirm=self.skip_confirm,
-            )
-            builder.initialize(change=change)
-            builder.prompts()
-            builder.apply()
-            builder.clear(filename)
-
-    def process_classes(self):
+    def scan(self, changes=[]):
         """
-        Main method that documents Classes in a file.
+        Generator that scans every file and yields (filename, candidates, source)
+        in the order of the file list, so prompting stays deterministic. With
+        more than one job the files are scanned in a process pool, biggest
+        files first so that a huge file does not keep the others waiting
+        at the end. Files the scan cache knows as unchanged and fully
+        documented are not scanned nor yielded
+        Parameters
+        ----------
+        list changes: Changes in a file, mainly use also with dyc diff.
         """
-        print("\nProcessing Classes\n\r")
+        cache = ScanCache.from_config(self.config)
+        fingerprints = dict()
+        changes_by_path = self._changes_by_path(changes)
+
+        tasks = []
         for filename in self.file_list:
             extension = get_extension(filename)
             fmt = self.formats.get(extension)
-            classes_cnf = fmt.get("class", {})
-            classes_cnf["parents"] = fmt.get("parents")
-            builder = ClassBuilder(
-                filename,
-                classes_cnf,
-                placeholders=self.placeholders,
-                skip_confirm=self.skip_confirm,
-            )
-            builder.initialize()
-            builder.prompts()
-            builder.apply()
-            builder.clear(filename)
-
-    def process_top(self, diff_only=False):
+            change = changes_by_path.get(filename)
+            if cache and not change:
+                if extension not in fingerprints:
+                    fingerprints[extension] = fingerprint(fmt)
+                if cache.lookup(filename, fingerprints[extension]) == []:
+                    # Unchanged and fully documented since the last run
+                    continue
+            tasks.append((filename, fmt, change, self.placeholders, self.skip_confirm))
+
+        jobs = self.jobs or multiprocessing.cpu_count()
+        parallel = jobs > 1 and len(tasks) > 1
+        tasks = [task + (not parallel,) for task in tasks]
+
+        try:
+            for filename, candidates, identity, source in self._scan_tasks(
+                tasks, jobs if parallel else 1
+            ):
+                if cache and not changes_by_path.get(filename):
+                    cache.store(
+                        filename,
+                        fingerprints[get_extension(filename)],
+                        identity,
+                        summarize(candidates),
+                    )
+                yield filename, candidates, source
+        finally:
+            if cache:
+                cache.save()
+
+    def _scan_tasks(self, tasks, jobs):
         """
-        Main method that documents a top of a file.
+        Runs scan_file over the tasks and yields the results in task order
+        Parameters
+        ----------
+        list tasks: Arguments of scan_file
+        int jobs: Number of worker processes, 1 scans in this process
         """
-        print("\nProcessing Top\n\r")
-        for filename in self.file_list:
+        if jobs == 1:
+            for task in tasks:
+                yield (task[0],) + scan_file(task)
+            return
 
-            extension = get_extension(filename)
-            fmt = self.formats.get(extension)
-            top_cnf = fmt.get("top", {})
-            builder = TopBuilder(
-                filename,
-                top_cnf,
-                placeholders=self.placeholders,
-                skip_confirm=self.skip_confirm,
-            )
-            builder.prompts()
-            builder.apply()
-            builder.clear(filename)
+        executor = ProcessPoolExecutor(max_workers=min(jobs, len(tasks)))
+        try:
+            futures = dict()
+            for task in sorted(tasks, key=lambda task: -file_size(task[0])):
+                futures[task[0]] = executor.submit(scan_file, task)
+            for task in tasks:
+                yield (task[0],) + futures[task[0]].result()
+        finally:
+            executor.shutdown(wait=True)
+
+    def _changes_by_path(self, changes):
+        """
+        Indexes the changes of a diff by path. When a file has more than one
+        change, i.e unstaged and staged, the first one is kept
+        Parameters
+        ----------
+        list changes: Changes in a file, mainly use also with dyc diff.
+        """
+        result = dict()
+        for change in changes:
+            result.setdefault(change.get("path"), change)
+        return result
+
+    def _builder(self, kind, filename, source=None):
+        """
+        Creates the builder of a kind for a file from its format
+        Parameters
+        ----------
+        str kind: One of KINDS
+        str filename: The file's name
+        SourceBuffer source: Already read buffer of the file
+        """
+        return create_builder(
+            kind,
+            filename,
+            self.formats.get(get_extension(filename)),
+            placeholders=self.placeholders,
+            skip_confirm=self.skip_confirm,
+            source=source,
+            state=self.state,
+        )
@@ -5,9 +5,7 @@ parsing and validation of the files happens.
 """
 import sys
 import re
-import fileinput
 import copy
-import linecache
 import click
 from .utils import (
     get_leading_whitespace,
@@ -17,12 +15,11 @@ from .utils import (
     is_one_line_method,
 )
 from .base import Builder
+from .scanner import Candidate
 import os
 
 
 class MethodBuilder(Builder):
-    already_printed_filepaths = []  # list of already printed files
-
     def extract_and_set_information(self, filename, start, line, length):
         """
         This is a main abstract method tin the builder base
@@ -35,87 +32,90 @@ class MethodBuilder(Builder):
         str line: Full line text
         int length: The length of the extracted data
         """
-        start_line = linecache.getline(filename, start)
+        start_line = self.source.line(start)
         initial_line = line
         start_leading_space = get_leading_whitespace(
             start_line
         )  # Where function started
-        method_string = start_line
         if not is_one_line_method(start_line, self.config.get("keywords")):
-            method_string = line
-            linesBackwards = method_string.count("\n") - 1
+            linesBackwards = line.count("\n") - 1
             start_leading_space = get_leading_whitespace(
-                linecache.getline(filename, start - linesBackwards)
+                self.source.line(start - linesBackwards)
             )
-        line_within_scope = True
-        lineno = start + 1
-        line = linecache.getline(filename, lineno)
-        end_of_file = False
-        end = None
-        while line_within_scope and not end_of_file:
-            current_leading_space = get_leading_whitespace(line)
-            if len(current_leading_space) <= len(start_leading_space) and line.strip():
-                end = lineno - 1
-                break
-            method_string += line
-            lineno = lineno + 1
-            line = linecache.getline(filename, int(lineno))
-            end_of_file = True if lineno > length else False
-
-        if not end:
-            end = length
-
-        linecache.clearcache()
-        return MethodInterface(
-            plain=method_string,
+        end = self.source.scopes.end(start, len(start_leading_space))
+
+        return Candidate(
             name=self._get_name(initial_line),
             start=start,
             end=end,
-            filename=filename,
+            decl_start=start - max(initial_line.count("\n") - 1, 0),
+            indent=get_leading_whitespace(initial_line),
             arguments=self.extract_arguments(initial_line.strip("\n")),
+        )
+
+    def interface(self, candidate):
+        """
+        Builds the interface of a confirmed candidate. Its body is read
+        from the shared source buffer only if the editor needs it
+        Parameters
+        ----------
+        Candidate candidate: A confirmed candidate
+        """
+        ignore = self.config.get("arguments", {}).get("ignore") or []
+        return MethodInterface(
+            plain=None,
+            name=candidate.name,
+            start=candidate.start,
+            end=candidate.end,
+            filename=self.filename,
+            arguments=[arg for arg in candidate.arguments if arg not in ignore],
             config=self.config,
-            leading_space=get_leading_whitespace(initial_line),
+            leading_space=candidate.indent,
             placeholders=self.placeholders,
+            decl_start=candidate.decl_start,
+            source=self.source,
         )
 
-    def validate(self, result):
+    def is_candidate(self, result):
         """
-        An abstract validator method that checks if the method is
-        still valid and gives the final decision
+        A predicate that checks if the extracted method is not ignored
+        and still misses a docstring
         Parameters
         ----------
-        MethodInterface result: The Method Interface result
+        Candidate result: A candidate method
         """
         if not result:
             return False
-        name = result.name
-        if name not in self.config.get(
+        return result.name not in self.config.get(
             "ignore", []
-        ) and not self.is_first_line_documented(result):
-            if (
-                self.filename not in self.already_printed_filepaths
-            ):  # Print file of method to document
-                click.echo(
-                    "\n\nIn file {} :\n".format(
-                        click.style(
-                            os.path.join(*self.filename.split(os.sep)[-3:]), fg="red"
-                        )
+        ) and not self.is_first_line_documented(result)
+
+    def confirm(self, result):
+        """
+        Asks the user to confirm documenting a candidate method
+        Parameters
+        ----------
+        Candidate result: A candidate method
+        """
+        if self.filename not in self.state.printed:  # Print file of method to document
+            click.echo(
+                "\n\nIn file {} :\n".format(
+                    click.style(
+                        os.path.join(*self.filename.split(os.sep)[-3:]), fg="red"
                     )
                 )
-                self.already_printed_filepaths.append(self.filename)
-            confirmed = (
-                True
-                if self.placeholders
-                else click.confirm(
-                    "Do you want to document method {}?".format(
-                        click.style(name, fg="green")
-                    )
+            )
+            self.state.printed.add(self.filename)
+        confirmed = (
+            True
+            if self.placeholders
+            else click.confirm(
+                "Do you want to document method {}?".format(
+                    click.style(result.name, fg="green")
                 )
             )
-            if confirmed:
-                return True
-
-        return False
+        )
+        return bool(confirmed)
 
     def extract_arguments(self, line):
         """
@@ -126,26 +126,24 @@ class MethodBuilder(Builder):
         """
         args = ArgumentDetails(line, self.config.get("arguments", {}))
         args.extract()
-        return args.sanitize()
+        return list(args.sanitize())
 
     def is_first_line_documented(self, result):
         """
         A boolean function that determines weather the first line has
-        a docstring or not
+        a docstring or not. Only the declaration and the first line of
+        its body are read, nested scopes are never scanned
         Parameters
         ----------
-        MethodInterface result: Is a method interface class that could be
+        Candidate result: Is a method candidate that could be
         subject to be taking a docstring
-        str line: The line of the found method
         """
-        returned = False
-        for x in range(result.start, result.end):
-            line = linecache.getline(result.filename, x)
+        first_body_line = self.source.scopes.first_after(result.start)
+        for x in range(result.start, min(first_body_line, result.end) + 1):
+            line = self.source.line(x)
             if self.config.get("open") in line:
-                returned = True
-                break
-        linecache.clearcache()
-        return returned
+                return True
+        return False
 
     def prompts(self):
         """
@@ -154,40 +152,20 @@ class MethodBuilder(Builder):
         for method_interface in self._method_interface_gen():
             method_interface.prompt() if method_interface else None
 
-    def apply(self):
+    def edits(self):
         """
         Over here we are looping over the result of the
-        chosen methods to document and applying the changes to the
-        files as confirmed
+        chosen methods to document and collecting the insertions
+        to apply on the file as confirmed
         """
-        for method_interface in self._method_interface_gen():
-            if not method_interface:
-                continue
-            fileInput = fileinput.input(method_interface.filename, inplace=True)
-
-            for line in fileInput:
-                tmpLine = line
-                if self._is_method(line) and ":" not in line:
-                    openedP = line.count("(")
-                    closedP = line.count(")")
-                    pos = 1
-                    if openedP == closedP:
-                        continue
-                    else:
-                        while openedP != closedP:
-                            tmpLine += fileInput.readline()
-                            openedP = tmpLine.count("(")
-                            closedP = tmpLine.count(")")
-                            pos += 1
-                        line = tmpLine
-
-                if self._get_name(line) == method_interface.name:
-                    if self.config.get("within_scope"):
-                        sys.stdout.write(line + method_interface.result + "\n")
-                    else:
-                        sys.stdout.write(method_interface.result + "\n" + line)
-                else:
-                    sys.stdout.write(line)
+        result = []
+        for method_interface in self.details.get(self.filename, {}).values():
+            if self.config.get("within_scope"):
+                lineno = method_interface.start + 1
+            else:
+                lineno = method_interface.decl_start
+            result.append((lineno, method_interface.result + "\n"))
+        return result
 
     def _method_interface_gen(self):
         """
@@ -421,8 +399,11 @@ class MethodInterface(MethodFormatter):
         config,
         leading_space,
         placeholders,
+        decl_start=None,
+        source=None,
     ):
-        self.plain = plain
+        self._plain = plain
+        self.source = source
         self.name = name
         self.start = start
         self.end = end
@@ -433,6 +414,16 @@ class MethodInterface(MethodFormatter):
         self.config = config
         self.leading_space = leading_space
         self.placeholders = placeholders
+        self.decl_start = start if decl_start is None else decl_start
+
+    @property
+    def plain(self):
+        """
+        Source of the method, read from the source buffer on first access
+        """
+        if self._plain is None and self.source is not None:
+            self._plain = self.source.text(self.decl_start, self.end)
+        return self._plain
 
     def prompt(self):
         """
@@ -512,6 +503,8 @@ class ArgumentDetails(object):
 
     def sanitize(self):
         """
-        Sanitizes arguments to validate all arguments are correct
+        Sanitizes arguments to validate all arguments are correct. Markers
+        without a name, like a bare `*` or `/`, are skipped
         """
-        return map(lambda arg: re.findall(r"[a-zA-Z0-9_]+", arg)[0], self.args)
+        names = (re.findall(r"[a-zA-Z0-9_]+", arg) for arg in self.args)
+        return [found[0] for found in names if found]
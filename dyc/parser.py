@@ -6,15 +6,22 @@ It parses all the configs to be consumed in DYC.
 """
 import copy
 import click
-from .configs import Config
+from .configs import Config, CUSTOM
+from .utils import read_yaml
 
 
 class ParsedConfig(Config):
-    def __init__(self):
+    def __init__(self, reload=False):
+        if reload:
+            # Read `dyc.yaml` again instead of the copy read at import time
+            self.custom = read_yaml(CUSTOM)
         self.plain = copy.deepcopy(self.default)
+        # Whether `dyc.yaml` was read, False when the defaults are used instead
+        self.valid = True
         try:
             self.override()
         except AttributeError:
+            self.valid = False
             click.echo(
                 click.style(
                     "`dyc.yaml` Missing or Incorrectly formatted. USING default settings",
@@ -0,0 +1,392 @@
+"""
+Scanning primitives shared by the builders.
+
+A file is read from disk once into a `SourceBuffer`. Candidate extraction,
+scope-end detection and the "already documented" checks all run against
+that buffer instead of going back to the file. Files larger than
+`MMAP_THRESHOLD` are mapped into a `MappedSource` instead, which only
+decodes the lines that are used.
+"""
+
+import os
+import mmap
+import array
+import bisect
+import locale
+import shutil
+import hashlib
+
+# Characters `get_leading_whitespace` counts as indentation
+WHITESPACE = " \t\v\f\r\n"
+# Files above this size in bytes are memory mapped instead of read
+MMAP_THRESHOLD = 8 * 1024 * 1024
+
+
+def open_source(filename):
+    """
+    Reads a file into a SourceBuffer, or maps it into a MappedSource when
+    it is larger than MMAP_THRESHOLD
+    Parameters
+    ----------
+    str filename: The file's name
+    """
+    try:
+        size = os.path.getsize(filename)
+    except OSError:
+        size = 0
+    if size > MMAP_THRESHOLD:
+        return MappedSource(filename)
+    return SourceBuffer(filename)
+
+
+def merge_insertions(lines, insertions):
+    """
+    Yields the lines of a file with the insertions placed before their
+    line. Insertions are (lineno, text) pairs where text is placed before
+    the 1-based line `lineno`; `len(lines) + 1` appends. Insertions on the
+    same line keep the order they were given in
+    Parameters
+    ----------
+    iterable lines: Lines of the file
+    list insertions: List of (lineno, text) pairs
+    """
+    pending = sorted(insertions, key=lambda insertion: insertion[0])
+    index = 0
+    line = ""
+    for lineno, line in enumerate(lines, start=1):
+        while index < len(pending) and pending[index][0] <= lineno:
+            yield pending[index][1]
+            index += 1
+        yield line
+    if index < len(pending) and line and not line.endswith("\n"):
+        yield "\n"
+    for lineno, text in pending[index:]:
+        yield text
+
+
+class SourceBuffer(object):
+    """
+    In-memory view of a source file: its lines plus a table of the
+    character offset at which each line starts
+    """
+
+    mapped = False
+
+    def __init__(self, filename, lines=None):
+        self.filename = filename
+        self.stat = None
+        if lines is None:
+            with open(filename, "r") as stream:
+                self.stat = os.fstat(stream.fileno())
+                lines = stream.readlines()
+        self.lines = lines
+        self.offsets = self._build_offsets(lines)
+        self._scopes = None
+        self._parsed = dict()
+
+    @property
+    def scopes(self):
+        """
+        ScopeTree of the buffer, built on first access and shared by every
+        builder of the file
+        """
+        if self._scopes is None:
+            self._scopes = ScopeTree(self)
+        return self._scopes
+
+    def parse(self, name, backend):
+        """
+        Declarations found by a scanner backend, computed once per content
+        and shared by every builder of the file
+        Parameters
+        ----------
+        str name: Name of the backend
+        function backend: Backend taking the buffer
+        """
+        if name not in self._parsed:
+            self._parsed[name] = backend(self)
+        return self._parsed[name]
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def _build_offsets(self, lines):
+        """
+        Computes the starting offset of every line in one pass
+        Parameters
+        ----------
+        list lines: Lines of the file
+        """
+        offsets = []
+        position = 0
+        for line in lines:
+            offsets.append(position)
+            position += len(line)
+        offsets.append(position)
+        return offsets
+
+    def line(self, lineno):
+        """
+        Gets a line by its 1-based number. Like `linecache.getline` it
+        returns an empty string when the line is out of range
+        Parameters
+        ----------
+        int lineno: Line number
+        """
+        if 1 <= lineno <= len(self.lines):
+            return self.lines[lineno - 1]
+        return ""
+
+    def text(self, start, end):
+        """
+        Joins the lines from start to end, both inclusive and 1-based
+        Parameters
+        ----------
+        int start: First line number
+        int end: Last line number
+        """
+        return "".join(self.lines[max(start - 1, 0) : max(end, 0)])
+
+    def digest(self):
+        """
+        Content hash of the buffer
+        """
+        content = "".join(self.lines)
+        if not isinstance(content, bytes):
+            content = content.encode("utf-8", "replace")
+        return hashlib.sha1(content).hexdigest()
+
+    def find_lines(self, keywords):
+        """
+        Numbers of the lines that contain any of the keywords, even as a
+        part of a word
+        Parameters
+        ----------
+        list keywords: Keywords to look for
+        """
+        for lineno, line in enumerate(self.lines, start=1):
+            if any(keyword in line for keyword in keywords):
+                yield lineno
+
+    def apply_insertions(self, insertions):
+        """
+        Writes the file back with all the insertions applied in a single
+        write. See `merge_insertions` for the insertions
+        Parameters
+        ----------
+        list insertions: List of (lineno, text) pairs
+        """
+        content = "".join(merge_insertions(self.lines, insertions))
+        with open(self.filename, "w") as stream:
+            stream.write(content)
+
+        self.lines = content.splitlines(True)
+        self.offsets = self._build_offsets(self.lines)
+        self._scopes = None
+        self._parsed = dict()
+
+
+class MappedSource(SourceBuffer):
+    """
+    SourceBuffer of a large file backed by `mmap`. Only the byte offset at
+    which each line starts is kept in memory, keywords are searched in the
+    raw bytes and lines are decoded one at a time when they are used
+    """
+
+    mapped = True
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.encoding = locale.getpreferredencoding(False)
+        with open(filename, "rb") as stream:
+            self.stat = os.fstat(stream.fileno())
+            self.map = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        self.offsets = self._build_offsets()
+        self._scopes = None
+        self._parsed = dict()
+
+    def _build_offsets(self):
+        """
+        Finds the starting byte offset of every line in the mapped file
+        """
+        offsets = array.array("L", [0])
+        position = self.map.find(b"\n")
+        while position != -1:
+            offsets.append(position + 1)
+            position = self.map.find(b"\n", position + 1)
+        if offsets[-1] != len(self.map):
+            offsets.append(len(self.map))
+        return offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for lineno in range(1, len(self) + 1):
+            yield self.line(lineno)
+
+    def line(self, lineno):
+        """
+        Decodes a line by its 1-based number, an empty string when the line
+        is out of range. Line endings are read as "\\n" like text files are
+        Parameters
+        ----------
+        int lineno: Line number
+        """
+        if not 1 <= lineno <= len(self):
+            return ""
+        raw = self.map[self.offsets[lineno - 1] : self.offsets[lineno]]
+        return raw.decode(self.encoding).replace("\r\n", "\n")
+
+    def text(self, start, end):
+        """
+        Joins the lines from start to end, both inclusive and 1-based
+        Parameters
+        ----------
+        int start: First line number
+        int end: Last line number
+        """
+        return "".join(self.line(lineno) for lineno in range(max(start, 1), end + 1))
+
+    def digest(self):
+        """
+        Content hash of the file, the same a SourceBuffer of it would give
+        """
+        digest = hashlib.sha1()
+        for line in self:
+            digest.update(line.encode("utf-8", "replace"))
+        return digest.hexdigest()
+
+    def find_lines(self, keywords):
+        """
+        Numbers of the lines that contain any of the keywords, found with a
+        byte search in the mapped file without decoding it
+        Parameters
+        ----------
+        list keywords: Keywords to look for
+        """
+        found = set()
+        for keyword in keywords:
+            needle = keyword.encode(self.encoding)
+            position = self.map.find(needle)
+            while position != -1:
+                found.add(bisect.bisect_right(self.offsets, position))
+                position = self.map.find(needle, position + 1)
+        return sorted(found)
+
+    def apply_insertions(self, insertions):
+        """
+        Streams the file with the insertions applied into a temporary file
+        that then replaces it, so the file is never held in memory
+        Parameters
+        ----------
+        list insertions: List of (lineno, text) pairs
+        """
+        temporary = "{}.{}.tmp".format(self.filename, os.getpid())
+        with open(temporary, "w") as stream:
+            for text in merge_insertions(self, insertions):
+                stream.write(text)
+        shutil.copymode(self.filename, temporary)
+        self.close()
+        if hasattr(os, "replace"):
+            os.replace(temporary, self.filename)
+        else:
+            os.rename(temporary, self.filename)
+        self.__init__(self.filename)
+
+    def close(self):
+        """
+        Unmaps the file
+        """
+        self.map.close()
+
+
+class ScopeTree(object):
+    """
+    Indentation tree of a file built in a single pass. Every non blank line
+    opens a scope that ends right before the next non blank line that is
+    not more indented, so the lines of a scope are its children and their
+    own scopes. Module, classes, methods and nested functions are all
+    nodes of it
+    """
+
+    def __init__(self, lines):
+        self.length = len(lines)
+        # Both indexed by 1-based line number, indents is -1 on blank lines
+        self.indents = array.array("l", [-1]) * (self.length + 2)
+        self.ends = array.array("l", [self.length]) * (self.length + 2)
+        opened = []
+        for lineno, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            indent = len(line) - len(line.lstrip(WHITESPACE))
+            while opened and self.indents[opened[-1]] >= indent:
+                self.ends[opened.pop()] = lineno - 1
+            self.indents[lineno] = indent
+            opened.append(lineno)
+
+    def first_after(self, lineno):
+        """
+        First non blank line after a line, `length + 1` if there is none
+        Parameters
+        ----------
+        int lineno: Line number
+        """
+        lineno += 1
+        while lineno <= self.length and self.indents[lineno] < 0:
+            lineno += 1
+        return lineno
+
+    def end(self, start, indent):
+        """
+        Last line of the scope of a declaration: the line before the first
+        non blank line after `start` that is not more indented than the
+        declaration. Nested scopes are skipped whole instead of line by line
+        Parameters
+        ----------
+        int start: Last line of the declaration
+        int indent: Indentation width of the declaration
+        """
+        lineno = self.first_after(start)
+        while lineno <= self.length and self.indents[lineno] > indent:
+            lineno = self.ends[lineno] + 1
+        return min(lineno - 1, self.length)
+
+
+class Candidate(object):
+    """
+    Compact record of a declaration found by a scan. It only keeps line
+    numbers into the file's SourceBuffer, never a copy of the body, and
+    is turned into a full interface once the user confirms it
+    """
+
+    __slots__ = ("name", "start", "end", "decl_start", "indent", "arguments")
+
+    def __init__(self, name, start, end, decl_start, indent, arguments):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.decl_start = decl_start
+        self.indent = indent
+        self.arguments = arguments
+
+    def __getstate__(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state):
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Candidate) and self.__getstate__() == other.__getstate__()
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "Candidate({!r}, {}-{})".format(self.name, self.decl_start, self.end)
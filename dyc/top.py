@@ -1,6 +1,4 @@
 import sys
-import fileinput
-import linecache
 import click
 from .utils import get_leading_whitespace, add_start_end
 from .base import Builder
@@ -8,15 +6,20 @@ from .base import Builder
 
 class TopBuilder(Builder):
     is_validated = False
+    candidates = None
 
     def validate(self):
         """
         An abstract validator method that checks if the top is
         still valid and gives the final decision
         """
+        if self.candidates is None:
+            self.initialize()
         current_file_dir = self.filename.split("\\")
-        if not self.is_top_file_documented():
-            confirmed = click.confirm(
+        if self.candidates:
+            # Placeholders are added without asking, like methods and classes,
+            # so the watcher never waits on a prompt
+            confirmed = self.placeholders or click.confirm(
                 "Do you want to document top of file {}?".format(
                     click.style("\\".join(current_file_dir[-3:]), fg="green")
                 )
@@ -32,12 +35,37 @@ class TopBuilder(Builder):
         a docstring or not
         """
         returned = False
-        line = linecache.getline(self.filename, 1)
+        line = self.source.line(1)
         if self.config.get("open") in line:
             returned = True
-        linecache.clearcache()
         return returned
 
+    def initialize(self, change=None, candidates=None):
+        """
+        Stores whether the top of the file is a candidate, which is then
+        confirmed while prompting
+        Parameters
+        ----------
+        dict change: Change of the file in a diff
+        list candidates: Result of a `scan` that already ran
+        """
+        if candidates is None:
+            candidates = self.scan(change=change)
+        self.candidates = candidates
+
+    def scan(self, change=None):
+        """
+        The top of a file is a candidate as long as it is not documented.
+        With a diff, only the top of a file the diff creates is, since the
+        top of an existing file is never part of what a change adds
+        Parameters
+        ----------
+        dict change: Change of the file in a diff
+        """
+        if change and not change.get("new"):
+            return []
+        return [] if self.is_top_file_documented() else [self.filename]
+
     def prompts(self):
         self._prompt_docstring()
         # TODO: Prompt args here as well
@@ -53,16 +81,15 @@ class TopBuilder(Builder):
                 name = click.style(self.filename, fg="green")
                 self.Top_docstring = click.prompt("\n({}) Top docstring ".format(name))
 
-    def apply(self):
-        if self.is_validated:
-            self.polish()
-            final_result = self.wrap_doc_strings(self.result)
-
-            for i, line in enumerate(fileinput.input(self.filename, inplace=True)):
-                if i == 0:
-                    sys.stdout.write(final_result + "\n" + line)
-                else:
-                    sys.stdout.write(line)
+    def edits(self):
+        """
+        Returns the insertion of the top docstring if it was confirmed
+        """
+        if not self.is_validated:
+            return []
+        self.polish()
+        final_result = self.wrap_doc_strings(self.result)
+        return [(1, final_result + "\n")]
 
     def wrap_strings(self, words):
         """
@@ -79,11 +106,7 @@ class TopBuilder(Builder):
 
     def confirm(self, polished):
         result = add_start_end(polished)
-        preview_line1, preview_line2 = (
-            linecache.getline(self.filename, 1),
-            linecache.getline(self.filename, 2),
-        )
-        linecache.clearcache()
+        preview_line1, preview_line2 = (self.source.line(1), self.source.line(2))
         try:
             message = click.edit(
                 "## CONFIRM: MODIFY DOCSTRING BETWEEN START AND END LINES ONLY\n\n"
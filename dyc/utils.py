@@ -2,8 +2,11 @@
 Reusable methods throughout DYC
 """
 import os
+import re
 import yaml
 import string
+import bisect
+import fnmatch
 
 INDENT_OPTIONS = {"tab": "\t", "2 spaces": "  ", "False": ""}
 
@@ -83,17 +86,24 @@ def get_extension(filename):
         return ""
 
 
-def all_files_generator(extensions=[]):
+def all_files_generator(extensions=[], excludes=None):
     """
     A generator that yields all candidate files to add docstrings
     on
     Parameters
     ----------
     list extensions: Allowed extensions on a file
+    PathRules excludes: Rules of directories that are never walked into
     """
-    for root, dirs, files in os.walk(os.getcwd()):
+    cwd = os.getcwd()
+    for root, dirs, files in os.walk(cwd):
         files = [os.path.join(root, f) for f in files if not f[0] == "."]
         dirs[:] = [d for d in dirs if not d[0] == "."]
+        if excludes:
+            relative_root = os.path.relpath(root, cwd)
+            dirs[:] = [
+                d for d in dirs if not excludes.match(os.path.join(relative_root, d))
+            ]
         if extensions:
             files = [
                 filename for filename in files if get_extension(filename) in extensions
@@ -101,6 +111,123 @@ def all_files_generator(extensions=[]):
         yield files
 
 
+def git_files(repo, extensions=[], untracked=True):
+    """
+    Lists the candidate files to add docstrings on from the git index,
+    which makes `.gitignore` apply without walking ignored directories.
+    Like the walk, it only lists files under the current directory and
+    skips hidden ones
+    Parameters
+    ----------
+    git.Repo repo: Repository of the project
+    list extensions: Allowed extensions on a file
+    bool untracked: Also list untracked files that are not ignored
+    """
+    root = repo.working_tree_dir
+    cwd = os.getcwd()
+    args = ["-z", "--cached"]
+    if untracked:
+        args += ["--others", "--exclude-standard"]
+    args += ["--", os.path.relpath(cwd, root)]
+
+    result = []
+    seen = set()
+    for path in repo.git.ls_files(*args).split("\0"):
+        if not path or path in seen:
+            continue
+        seen.add(path)
+        if extensions and get_extension(path) not in extensions:
+            continue
+        if any(part[0] == "." for part in path.split("/")):
+            continue
+        full_path = os.path.join(root, path)
+        # Tracked files deleted from the working tree are still in the index
+        if os.path.isfile(full_path):
+            result.append(os.path.normpath(full_path))
+    return result
+
+
+class PathRules(object):
+    """
+    Compiled include or exclude rules, matched against paths relative to
+    the root of the project. A rule is a glob, or a regular expression when
+    prefixed by `re:`. A glob without a slash matches a file or directory
+    name at any depth, otherwise it matches the whole relative path
+    """
+
+    def __init__(self, patterns=None):
+        names = []
+        paths = []
+        for pattern in patterns or []:
+            if pattern.startswith("re:"):
+                paths.append(pattern[3:])
+            elif "/" in pattern:
+                paths.append(fnmatch.translate(pattern.strip("/")))
+            else:
+                names.append(fnmatch.translate(pattern))
+        self.names = self._compile(names)
+        self.paths = self._compile(paths)
+
+    def __bool__(self):
+        return bool(self.names or self.paths)
+
+    __nonzero__ = __bool__
+
+    def _compile(self, patterns):
+        """
+        Compiles a list of regular expressions into a single one
+        Parameters
+        ----------
+        list patterns: Regular expressions
+        """
+        if not patterns:
+            return None
+        return re.compile("|".join("(?:{})".format(p) for p in patterns))
+
+    def match(self, path):
+        """
+        Checks if a relative path matches one of the rules
+        Parameters
+        ----------
+        str path: Path relative to the root of the project
+        """
+        path = path.replace(os.sep, "/")
+        if path.startswith("./"):
+            path = path[2:]
+        if self.paths and self.paths.match(path):
+            return True
+        return bool(self.names and self.names.match(path.rsplit("/", 1)[-1]))
+
+    def match_tree(self, path):
+        """
+        Checks if a relative path or any of its parent directories matches
+        one of the rules
+        Parameters
+        ----------
+        str path: Path relative to the root of the project
+        """
+        parts = path.replace(os.sep, "/").split("/")
+        for index in range(len(parts), 0, -1):
+            if self.match("/".join(parts[:index])):
+                return True
+        return False
+
+
+def git_error_message(error):
+    """
+    The message git wrote on stderr for a failed command, without the
+    decoration GitPython wraps it in
+    Parameters
+    ----------
+    git.exc.GitCommandError error: Error of a failed git command
+    """
+    message = (error.stderr or "").strip()
+    prefix = "stderr: '"
+    if message.startswith(prefix) and message.endswith("'"):
+        message = message[len(prefix) : -1].strip()
+    return message or str(error)
+
+
 def add_start_end(string):
     """
     Utility method add the START and END for a docstring
@@ -158,10 +285,55 @@ def get_additions_in_first_hunk(hunk):
         return None, None
     adds_patch = hunk[0].split("+")[-1].split(",")
     start = int(adds_patch[0])
-    end = int(start) + int(adds_patch[1])
+    # The count is left out of the hunk when it is a single line
+    count = int(adds_patch[1]) if len(adds_patch) > 1 else 1
+    end = start + count
     return start, end
 
 
+class HunkIndex(object):
+    """
+    Sorted index over the added hunks of a file. The hunks of a file never
+    overlap, so the one holding a line is found with a single bisect
+    """
+
+    def __init__(self, hunks):
+        self.hunks = sorted(
+            [hunk for hunk in hunks or [] if (hunk.get("hunk") or [None])[0]],
+            key=lambda hunk: hunk.get("hunk")[0],
+        )
+        self.starts = [hunk.get("hunk")[0] for hunk in self.hunks]
+        self.added = dict()
+
+    def __len__(self):
+        return len(self.hunks)
+
+    def find(self, lineno):
+        """
+        Gets the hunk whose range holds a line, None if there is none
+        Parameters
+        ----------
+        int lineno: Line number
+        """
+        index = bisect.bisect_right(self.starts, lineno) - 1
+        if index < 0:
+            return None
+        start, end = self.hunks[index].get("hunk")
+        return self.hunks[index] if start <= lineno <= end else None
+
+    def added_lines(self, hunk):
+        """
+        The set of lines added by a hunk, built the first time it is needed
+        Parameters
+        ----------
+        dict hunk: One of the indexed hunks
+        """
+        key = id(hunk)
+        if key not in self.added:
+            self.added[key] = set(hunk.get("patch", "").split("\n"))
+        return self.added[key]
+
+
 def is_one_line_method(line, keywords):
     """
     Gets True if the line holds a complete method declaration (from 'def to :),
@@ -17,6 +17,7 @@ setup(
         "pyyaml>=4.2b1",
         "gitpython>=2.1.11",
         "gitdb2;python_version>'3.4'",
+        "futures;python_version<'3'",
         "watchdog==0.9.0",
         "pre-commit==1.18.1",
     ],
@@ -0,0 +1,187 @@
+import copy
+from dyc.backends import parse_python, braces, brace_blocks
+from dyc.configs import Config
+from dyc.main import create_builder
+from dyc.scanner import SourceBuffer
+
+SOURCE = '''import os
+
+
+@decorator(", def x(")
+def a(x, y=",", *args, **kwargs):
+    return x
+
+
+class B(Base, os.Other):
+    """Documented"""
+
+    async def c(
+        self,
+        z,
+    ):
+        # comment
+        return z
+
+    def d(self): return 1
+'''
+
+JS_SOURCE = """/** Documented */
+function a(x, y = "{", ...rest) {
+  // a } in a comment
+  return `${x}}`;
+}
+
+export class B extends A {
+  method(z) {
+    const f = function (q) { return q; };
+  }
+}
+"""
+
+
+def make_builder(kind, path, scanner):
+    fmt = copy.deepcopy(Config.default["formats"][0])
+    fmt["scanner"] = scanner
+    return create_builder(kind, str(path), fmt)
+
+
+class TestPythonAst:
+    def test_declarations(self, tmpdir):
+        """Test that functions and classes come with exact lines and arguments"""
+        path = tmpdir.join("sample.py")
+        path.write(SOURCE)
+        declarations = [
+            (kind, documented, c.name, c.decl_start, c.start, c.end, c.arguments)
+            for kind, documented, c in parse_python(SourceBuffer(str(path)))
+        ]
+        assert declarations == [
+            ("def", False, "a", 5, 5, 8, ["x", "y", "args", "kwargs"]),
+            ("class", True, "B", 9, 9, 19, ["Base"]),
+            ("def", False, "c", 12, 15, 18, ["self", "z"]),
+        ]
+
+    def test_decorated_first_statement(self, tmpdir):
+        """Test that a decorated first member does not end the declaration"""
+        path = tmpdir.join("sample.py")
+        path.write(
+            "class A:\n    @property\n    def x(self):\n"
+            "        @wraps(\n            x\n        )\n"
+            "        def y():\n            pass\n"
+            "        return y\n"
+        )
+        declarations = [
+            (c.name, c.decl_start, c.start)
+            for _, _, c in parse_python(SourceBuffer(str(path)))
+        ]
+        assert declarations == [("A", 1, 1), ("x", 3, 3), ("y", 7, 7)]
+
+    def test_syntax_error_is_none(self, tmpdir):
+        """Test that a file the parser rejects gives no declarations"""
+        path = tmpdir.join("broken.py")
+        path.write("def a(:\n    pass\n")
+        assert parse_python(SourceBuffer(str(path))) is None
+
+
+class TestAstScanner:
+    def test_builders_use_the_backend(self, tmpdir):
+        """Test that builders skip documented classes and ignored arguments"""
+        path = tmpdir.join("sample.py")
+        path.write(SOURCE)
+        methods = make_builder("method", path, "ast")
+        assert [c.name for c in methods.scan()] == ["a", "c"]
+        assert make_builder("class", path, "ast").scan() == []
+        (candidate,) = [c for c in methods.scan() if c.name == "c"]
+        assert methods.interface(candidate).arguments == ["z"]
+
+    def test_docstrings_after_decorated_members(self, tmpdir):
+        """Test that docstrings go before the decorators of a first member"""
+        path = tmpdir.join("sample.py")
+        path.write(
+            "class A:\n    @property\n    def x(self):\n"
+            "        @wraps(x)\n        def y():\n            pass\n"
+            "        return y\n"
+        )
+        for kind in ("class", "method"):
+            builder = make_builder(kind, path, "ast")
+            builder.placeholders = True
+            builder.skip_confirm = True
+            builder.initialize()
+            builder.prompts()
+            builder.apply()
+            builder.clear(str(path))
+        content = path.read()
+        compile(content, str(path), "exec")
+        assert 'class A:\n    """' in content
+        assert '    def x(self):\n        """' in content
+        assert '        def y():\n            """' in content
+
+    def test_falls_back_to_keywords(self, tmpdir):
+        """Test that a syntax error falls back to the keyword heuristics"""
+        path = tmpdir.join("broken.py")
+        path.write("def a(x):\n    return x\n\nprint 'py2'\n")
+        assert [c.name for c in make_builder("method", path, "ast").scan()] == ["a"]
+
+
+class TestBraces:
+    def test_blocks_skip_strings_and_comments(self, tmpdir):
+        """Test that braces in strings and comments do not open blocks"""
+        path = tmpdir.join("sample.js")
+        path.write(JS_SOURCE)
+        blocks = brace_blocks(SourceBuffer(str(path)))
+        assert [(b.decl_start, b.start, b.end) for b in blocks] == [
+            (2, 2, 5),
+            (7, 7, 11),
+            (8, 8, 10),
+            (9, 9, 9),
+        ]
+        assert blocks[0].header == 'function a(x, y = "", ...rest)'
+        assert blocks[0].before == "/** Documented */"
+
+    def test_declarations(self, tmpdir):
+        """Test that blocks using the keywords become candidates"""
+        path = tmpdir.join("sample.js")
+        path.write(JS_SOURCE)
+        source = SourceBuffer(str(path))
+        config = dict(keywords=["function"], open="/**", within_scope=False)
+        declarations = [
+            (documented, c.name, c.decl_start, c.start, c.end, c.arguments)
+            for documented, c in braces(source, config)
+        ]
+        assert declarations == [(True, "a", 2, 2, 5, ["x", "y", "rest"])]
+        config = dict(keywords=["class"], open="/**")
+        assert [c.name for _, c in braces(source, config)] == ["B"]
+
+    def test_go_receiver(self, tmpdir):
+        """Test that the receiver of a Go method is not taken as its name"""
+        path = tmpdir.join("sample.go")
+        path.write("func (s *Server) Start(ctx context.Context, n int) error {\n}\n")
+        config = dict(keywords=["func"], open="//", argument_names="first")
+        ((documented, candidate),) = braces(SourceBuffer(str(path)), config)
+        assert (candidate.name, candidate.arguments) == ("Start", ["ctx", "n"])
+        assert not documented
+
+    def test_java_types(self, tmpdir):
+        """Test that Java types are not taken as argument or method names"""
+        path = tmpdir.join("Sample.java")
+        path.write(
+            "public class B {\n"
+            "  /** Documented */\n"
+            "  public int add(int first, Map<String, List<Integer>> second) {\n"
+            "    return first;\n"
+            "  }\n"
+            "  public void run(final String... names) {\n"
+            "  }\n"
+            "}\n"
+        )
+        source = SourceBuffer(str(path))
+        config = dict(keywords=["public"], open="/**")
+        declarations = [
+            (documented, c.name, c.start, c.end, c.arguments)
+            for documented, c in braces(source, config)
+        ]
+        assert declarations == [
+            (True, "add", 3, 5, ["first", "second"]),
+            (False, "run", 6, 7, ["names"]),
+        ]
+        config = dict(keywords=["class"], open="/**")
+        assert [c.name for _, c in braces(source, config)] == ["B"]
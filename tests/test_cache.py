@@ -0,0 +1,69 @@
+import os
+from dyc.cache import ScanCache, DiffCache, fingerprint
+from dyc.scanner import SourceBuffer
+
+
+def identity(path):
+    source = SourceBuffer(path)
+    return (source.stat.st_mtime, source.stat.st_size, source.digest())
+
+
+class TestScanCache:
+    def test_hit_on_unchanged_file(self, tmpdir):
+        """Test that an unchanged file is found in a reloaded cache"""
+        path = str(tmpdir.join("a.py"))
+        with open(path, "w") as stream:
+            stream.write("x = 1\n")
+        cache = ScanCache(str(tmpdir.join("cache")))
+        cache.store(path, "cnf", identity(path), [])
+        cache.save()
+
+        reloaded = ScanCache(str(tmpdir.join("cache")))
+        assert reloaded.lookup(path, "cnf") == []
+
+    def test_miss_on_changed_file_or_config(self, tmpdir):
+        """Test that content and config changes invalidate an entry"""
+        path = str(tmpdir.join("a.py"))
+        with open(path, "w") as stream:
+            stream.write("x = 1\n")
+        cache = ScanCache(str(tmpdir.join("cache")))
+        cache.store(path, "cnf", identity(path), [])
+        assert cache.lookup(path, "other") is None
+
+        with open(path, "w") as stream:
+            stream.write("x = 2\n")
+        assert cache.lookup(path, "cnf") is None
+
+    def test_least_recently_used_eviction(self, tmpdir):
+        """Test that the oldest entries are dropped above the cap"""
+        cache = ScanCache(str(tmpdir.join("cache")), max_entries=2)
+        paths = []
+        for name in ("a.py", "b.py", "c.py"):
+            path = str(tmpdir.join(name))
+            with open(path, "w") as stream:
+                stream.write(name)
+            cache.store(path, "cnf", identity(path), [])
+            paths.append(path)
+        cache.lookup(paths[0], "cnf")
+        cache.save()
+        assert sorted(cache.entries) == sorted([paths[0], paths[2]])
+        assert os.path.exists(str(tmpdir.join("cache", ".gitignore")))
+
+    def test_fingerprint_is_stable(self):
+        """Test that the fingerprint does not depend on key order"""
+        assert fingerprint({"a": 1, "b": [2]}) == fingerprint({"b": [2], "a": 1})
+
+
+class TestDiffCache:
+    def test_states_are_capped(self, tmpdir):
+        """Test that only the most recently used states are kept"""
+        cache = DiffCache(str(tmpdir.join("cache")))
+        for index in range(DiffCache.MAX_ENTRIES + 2):
+            cache.store("state{}".format(index), [dict(path="a.py")])
+        cache.lookup("state0")
+        cache.save()
+
+        reloaded = DiffCache(str(tmpdir.join("cache")))
+        assert len(reloaded.entries) == DiffCache.MAX_ENTRIES
+        assert reloaded.lookup("state0") == [dict(path="a.py")]
+        assert reloaded.lookup("state1") is None
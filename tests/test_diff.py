@@ -0,0 +1,230 @@
+import copy
+import git
+import click
+import pytest
+from click.testing import CliRunner
+from dyc.configs import Config
+from dyc.diff import Diff, DiffParser
+from dyc.main import DYC
+from dyc.dyc import main
+
+
+@pytest.fixture
+def repo(tmpdir):
+    """A repository with one committed file, run from its root"""
+    repository = git.Repo.init(str(tmpdir))
+    with repository.config_writer() as writer:
+        writer.set_value("user", "name", "dyc")
+        writer.set_value("user", "email", "dyc@example.com")
+    tmpdir.join("a.py").write("def a(x):\n    return x\n")
+    repository.index.add(["a.py"])
+    repository.index.commit("initial")
+    with tmpdir.as_cwd():
+        yield repository
+
+
+def config(cache=False):
+    cnf = copy.deepcopy(Config.default)
+    cnf["cache"] = dict(enabled=cache)
+    return cnf
+
+
+def count_diffs(monkeypatch):
+    """Records the `git diff` calls that produce patches"""
+    calls = []
+    original = git.cmd.Git._call_process
+
+    def counting(self, method, *args, **kwargs):
+        if method == "diff" and "--raw" not in args:
+            calls.append(args)
+        return original(self, method, *args, **kwargs)
+
+    monkeypatch.setattr(git.cmd.Git, "_call_process", counting)
+    return calls
+
+
+class TestDiffParser:
+    def test_split_sections(self):
+        """Test the diff is split per file into added hunks in one pass"""
+        plain = [
+            "diff --git a/a.py b/a.py",
+            "--- a/a.py",
+            "+++ b/a.py",
+            "@@ -1,0 +1,2 @@",
+            "+x",
+            "++y",
+            "@@ -5 +6,0 @@",
+            "-removed",
+            "diff --git a/b.py b/b.py",
+            "new file mode 100644",
+            "+++ b/b.py",
+            "@@ -1 +1 @@",
+            "-z",
+            "+y",
+        ]
+        headers = dict()
+        sections = DiffParser()._split(iter(plain), headers=headers)
+        assert sections["diff --git a/a.py b/a.py"] == [
+            dict(hunk=[1, 3], patch="x\n+y")
+        ]
+        assert sections["diff --git a/b.py b/b.py"] == [dict(hunk=[1, 2], patch="y")]
+        assert headers == {
+            "diff --git a/a.py b/a.py": dict(path="a.py", new=False),
+            "diff --git a/b.py b/b.py": dict(path="b.py", new=True),
+        }
+        wanted = {"diff --git a/b.py b/b.py"}
+        assert list(DiffParser()._split(iter(plain), wanted=wanted)) == list(wanted)
+
+
+class TestDiff:
+    def test_uncommitted_additions(self, repo, tmpdir):
+        """Test the added lines of an unstaged change are found"""
+        tmpdir.join("a.py").write(
+            "def a(x):\n    return x\n\n\ndef b(y):\n    return y\n"
+        )
+        changes = Diff(config()).uncommitted
+        assert [change["path"] for change in changes] == ["a.py"]
+        additions = changes[0]["additions"]
+        assert any("def b(y):" in hunk["patch"] for hunk in additions)
+
+    def test_single_diff_invocation(self, repo, tmpdir, monkeypatch):
+        """Test unstaged and staged changes share one git diff"""
+        tmpdir.join("a.py").write("def a(x):\n    return x\n\n\ndef b(y):\n    pass\n")
+        tmpdir.join("notes.txt").write("not a candidate\n")
+        repo.index.add(["a.py", "notes.txt"])
+        tmpdir.join("a.py").write(
+            "def a(x):\n    return x\n\n\ndef b(y):\n    return y\n"
+        )
+        diff = Diff(config())
+        calls = count_diffs(monkeypatch)
+        changes = diff.uncommitted
+        assert len(calls) == 1
+        assert "--unified=0" in calls[0] and "*.py" in calls[0]
+        assert {change["path"] for change in changes} == {"a.py"}
+        last = changes[-1]["additions"][-1]
+        assert last["hunk"] == [3, 7]
+        assert last["patch"] == "\n\ndef b(y):\n    return y"
+
+    def test_uncommitted_for_one_path(self, repo, tmpdir):
+        """Test the diff can be limited to one path"""
+        tmpdir.join("b.py").write("x = 1\n")
+        repo.index.add(["b.py"])
+        repo.index.commit("second")
+        tmpdir.join("a.py").write("def a(x):\n    return x\n\n\ndef c():\n    pass\n")
+        tmpdir.join("b.py").write("x = 2\n")
+        diff = Diff(config())
+        assert {change["path"] for change in diff.uncommitted} == {"a.py", "b.py"}
+        assert [change["path"] for change in diff.uncommitted_for(["a.py"])] == ["a.py"]
+
+    def test_candidates_without_walking(self, repo, tmpdir, monkeypatch):
+        """Test that candidacy comes from the path alone, with no tree walk"""
+
+        def walk(*args, **kwargs):
+            raise AssertionError("the tree was walked")
+
+        monkeypatch.setattr("dyc.base.all_files_generator", walk)
+        cnf = config()
+        cnf["exclude"] = ["vendor"]
+        cnf["include"] = ["src/", "a.py"]
+        diff = Diff(cnf)
+        assert diff.is_candidate("a.py")
+        assert diff.is_candidate("src/b.py")
+        assert not diff.is_candidate("src/vendor/c.py")
+        assert not diff.is_candidate("lib/d.py")
+        assert not diff.is_candidate("src/notes.txt")
+        cnf["file_list"] = [str(tmpdir.join("a.py"))]
+        assert Diff(cnf).is_candidate("a.py")
+        assert not Diff(cnf).is_candidate("src/b.py")
+
+    def test_cached_until_the_state_changes(self, repo, tmpdir, monkeypatch):
+        """Test that an unchanged tree reuses the cached changes"""
+        tmpdir.join("a.py").write("def a(x):\n    return x\n\n\ndef b(y):\n    pass\n")
+        tmpdir.join("b.py").write("x = 1\n")
+        repo.index.add(["b.py"])
+        repo.index.commit("second")
+        calls = count_diffs(monkeypatch)
+        first = Diff(config(cache=True)).uncommitted
+        assert len(calls) == 1
+        assert Diff(config(cache=True)).uncommitted == first
+        assert len(calls) == 1
+
+        # A clean file that gets modified
+        tmpdir.join("b.py").write("x = 2\n")
+        changes = Diff(config(cache=True)).uncommitted
+        assert len(calls) == 2
+        assert {change["path"] for change in changes} == {"a.py", "b.py"}
+
+        # Staging and committing
+        repo.index.add(["a.py", "b.py"])
+        Diff(config(cache=True)).uncommitted
+        assert len(calls) == 3
+        repo.index.commit("third")
+        assert Diff(config(cache=True)).uncommitted == []
+        assert len(calls) == 4
+
+    def test_between_since_branch_point(self, repo, tmpdir, monkeypatch):
+        """Test everything a branch added is found with one git diff"""
+        base = repo.head.commit.hexsha
+        tmpdir.join("a.py").write("def a(x):\n    return x\n\n\ndef b(y):\n    pass\n")
+        tmpdir.join("new file.py").write("def c():\n    pass\n")
+        repo.index.add(["a.py", "new file.py"])
+        repo.index.commit("feature")
+        tmpdir.join("a.py").remove()
+        repo.index.remove(["a.py"])
+        repo.index.commit("removal")
+        tmpdir.join("new file.py").write("def c():\n    pass\n\n\ndef d():\n    pass\n")
+        calls = count_diffs(monkeypatch)
+        changes = Diff(config()).between(since=base)
+        assert len(calls) == 1
+        assert [change["path"] for change in changes] == ["new file.py"]
+        assert changes[0]["new"]
+        assert changes[0]["additions"] == [
+            dict(hunk=[1, 7], patch="def c():\n    pass\n\n\ndef d():\n    pass")
+        ]
+
+    def test_between_range(self, repo, tmpdir):
+        """Test a range of commits leaves the working tree out"""
+        tmpdir.join("b.py").write("def b():\n    pass\n")
+        repo.index.add(["b.py"])
+        repo.index.commit("second")
+        tmpdir.join("a.py").write("def a(x):\n    return x\n\n\ndef c():\n    pass\n")
+        changes = Diff(config()).between(revisions="HEAD~1..HEAD")
+        assert [change["path"] for change in changes] == ["b.py"]
+        assert changes[0]["additions"][0]["hunk"] == [1, 3]
+
+    def test_bad_revision_is_a_usage_error(self, repo):
+        """Test that git's error on a bad revision is shown without a traceback"""
+        for args in (["--range", "nonexist..HEAD"], ["--since", "nonexist"]):
+            result = CliRunner().invoke(main, ["diff"] + args)
+            assert result.exit_code == 2
+            assert "Invalid value for" in result.output and args[0] in result.output
+            assert "nonexist" in result.output
+            assert "Traceback" not in result.output
+
+    def test_every_kind_in_the_diff(self, repo, tmpdir):
+        """Test that a diff documents new methods, classes and new files only"""
+        tmpdir.join("a.py").write(
+            "def a(x):\n    return x\n\n\nclass B:\n    def c(self):\n        pass\n"
+        )
+        tmpdir.join("d.py").write("def d(y):\n    return y\n")
+        repo.index.add(["d.py"])
+        changes = Diff(config()).uncommitted
+        assert {change["path"]: change["new"] for change in changes} == {
+            "a.py": False,
+            "d.py": True,
+        }
+        dyc = DYC(config(), placeholders=True)
+        dyc.prepare(files=[change["path"] for change in changes])
+
+        @click.command()
+        def runner():
+            dyc.process(changes=changes)
+
+        result = CliRunner().invoke(runner)
+        assert result.exception is None
+        a = tmpdir.join("a.py").read()
+        assert a.startswith("def a(x):\n    return x\n")
+        assert 'class B:\n    """\n    <docstring>' in a
+        assert '    def c(self):\n        """\n        <docstring>' in a
+        d = tmpdir.join("d.py").read()
+        assert d.startswith('"""\n<docstring>\n"""\ndef d(y):\n    """')
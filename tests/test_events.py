@@ -0,0 +1,116 @@
+import copy
+import threading
+import git
+import pytest
+from watchdog.events import FileModifiedEvent, DirModifiedEvent
+from dyc.configs import Config
+from dyc.events import EventQueue, WatchEvent
+
+
+class FakeConfig(object):
+    def __init__(self):
+        self.plain = copy.deepcopy(Config.default)
+        self.plain["watch"] = dict(debounce=0)
+
+
+@pytest.fixture
+def handler(tmpdir):
+    git.Repo.init(str(tmpdir))
+    with tmpdir.as_cwd():
+        yield WatchEvent(FakeConfig())
+
+
+class TestEventQueue:
+    def test_bursts_are_coalesced(self):
+        """Test that many events on a path are handed out once"""
+        queue = EventQueue(debounce=0.01)
+        for path in ["b.py", "a.py", "b.py", "a.py"]:
+            queue.push(path)
+        assert queue.pop() == ["a.py", "b.py"]
+        assert queue.pending == {}
+
+    def test_close_wakes_up_pop(self):
+        """Test that closing the queue stops a waiting worker"""
+        queue = EventQueue(debounce=0.01)
+        result = []
+        worker = threading.Thread(target=lambda: result.append(queue.pop()))
+        worker.start()
+        queue.close()
+        worker.join(timeout=1)
+        assert result == [None]
+
+
+class TestWatchEvent:
+    def test_only_candidate_paths_are_queued(self, handler):
+        """Test that hidden, directory and foreign extension events are dropped"""
+        for event in [
+            FileModifiedEvent("./a.py"),
+            FileModifiedEvent("./.git/index"),
+            FileModifiedEvent("./.a.py.swp"),
+            FileModifiedEvent("./notes.txt"),
+            DirModifiedEvent("./src"),
+            FileModifiedEvent("./src/b.py"),
+        ]:
+            handler.dispatch(event)
+        assert sorted(handler.queue.pending) == ["a.py", "src/b.py"]
+
+    def test_unchanged_content_is_skipped(self, handler, tmpdir):
+        """Test that rewriting the same content does not run DYC again"""
+        tmpdir.join("a.py").write("x = 1\n")
+        assert handler.changed(["a.py"]) == ["a.py"]
+        handler.remember(["a.py"])
+        tmpdir.join("a.py").write("x = 1\n")
+        assert handler.changed(["a.py"]) == []
+        tmpdir.join("a.py").write("x = 2\n")
+        assert handler.changed(["a.py", "gone.py"]) == ["a.py"]
+
+    def test_config_is_reloaded(self, handler, tmpdir, monkeypatch):
+        """Test that editing dyc.yaml swaps in the new config and rules"""
+        custom = str(tmpdir.join("dyc.yaml"))
+        monkeypatch.setattr("dyc.events.CUSTOM", custom)
+        monkeypatch.setattr("dyc.parser.CUSTOM", custom)
+        handler.config_path = handler.relative(custom)
+        handler.digests["a.py"] = "stale"
+        tmpdir.join("dyc.yaml").write("exclude:\n  - 'src/'\n")
+        handler.dispatch(FileModifiedEvent("./dyc.yaml"))
+        assert sorted(handler.queue.pending) == ["dyc.yaml"]
+        handler.reload()
+        assert handler.config.plain["exclude"] == ["src/"]
+        assert handler.digests == {}
+        handler.dispatch(FileModifiedEvent("./src/b.py"))
+        assert sorted(handler.queue.pending) == ["dyc.yaml"]
+
+    def test_process_documents_every_kind(self, handler, tmpdir):
+        """Test that the watcher documents classes and the top of new files"""
+        repo = git.Repo(str(tmpdir))
+        with repo.config_writer() as writer:
+            writer.set_value("user", "name", "dyc")
+            writer.set_value("user", "email", "dyc@example.com")
+        tmpdir.join("a.py").write("x = 1\n")
+        repo.index.add(["a.py"])
+        repo.index.commit("initial")
+        tmpdir.join("b.py").write("class B:\n    def run(self, y):\n        return y\n")
+        repo.index.add(["b.py"])
+        handler.config.plain["cache"] = dict(enabled=False)
+        handler.process(["b.py"])
+        content = tmpdir.join("b.py").read()
+        assert content.startswith('"""\n<docstring>\n"""\nclass B:\n    """')
+        assert '    def run(self, y):\n        """' in content
+
+    def test_malformed_config_is_not_reloaded(self, handler, tmpdir, monkeypatch):
+        """Test that a config that does not parse keeps the previous one"""
+        custom = str(tmpdir.join("dyc.yaml"))
+        monkeypatch.setattr("dyc.events.CUSTOM", custom)
+        monkeypatch.setattr("dyc.parser.CUSTOM", custom)
+        handler.config_path = handler.relative(custom)
+        tmpdir.join("dyc.yaml").write("exclude:\n  - 'vendor'\n")
+        handler.reload()
+        config, diff = handler.config, handler.diff
+        handler.digests["a.py"] = "seen"
+        for content in ["exclude: [vendor\n", ""]:
+            tmpdir.join("dyc.yaml").write(content)
+            handler.reload()
+            assert handler.config is config and handler.diff is diff
+            assert handler.config.plain["exclude"] == ["vendor"]
+            assert handler.digests == {"a.py": "seen"}
+        assert not handler.is_candidate("vendor/b.py")
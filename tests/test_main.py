@@ -0,0 +1,108 @@
+import copy
+import click
+from click.testing import CliRunner
+from dyc.configs import Config
+from dyc.main import DYC
+
+
+def make_dyc(files):
+    config = copy.deepcopy(Config.default)
+    config["file_list"] = files
+    config["cache"] = dict(enabled=False)
+    dyc = DYC(config, placeholders=True)
+    dyc.prepare()
+    return dyc
+
+
+def run_process(dyc):
+    """Runs `dyc.process()` from a click command, like the CLI does"""
+
+    @click.command()
+    def runner():
+        dyc.process()
+
+    result = CliRunner().invoke(runner)
+    assert result.exception is None
+
+
+class TestProcess:
+    def test_single_write_for_all_kinds(self, tmpdir):
+        """Test that methods, classes and top are documented in one pass"""
+        path = tmpdir.join("sample.py")
+        path.write("class A:\n    x = 1\n\n    def b(self, c):\n        return c\n")
+        dyc = make_dyc([str(path)])
+        run_process(dyc)
+        content = path.read()
+        assert content.startswith('"""\n<docstring>\n"""\nclass A:\n    """')
+        assert '    def b(self, c):\n        """\n        <docstring>' in content
+        assert content.count("<docstring>") == 3
+        assert dyc.state.details == {}
+        assert dyc.state.printed == set()
+
+    def test_argument_markers_without_a_name(self, tmpdir):
+        """Test that bare `*` and `/` markers do not abort the run"""
+        path = tmpdir.join("sample.py")
+        path.write(
+            'def f(a, *, key=None):\n    """Doc"""\n    return a\n\n\n'
+            "def g(b, /, c):\n    return b\n"
+        )
+        dyc = make_dyc([str(path)])
+        run_process(dyc)
+        content = path.read()
+        assert content.count("<docstring>") == 2
+        assert '    """Doc"""\n    return a' in content
+        assert 'def g(b, /, c):\n    """\n    <docstring>' in content
+
+    def test_mapped_files_are_documented(self, tmpdir, monkeypatch):
+        """Test that large files documented through mmap get the same docstrings"""
+        monkeypatch.setattr("dyc.scanner.MMAP_THRESHOLD", 1)
+        path = tmpdir.join("sample.py")
+        path.write("def b(c):\n    return c\n")
+        dyc = make_dyc([str(path)])
+        run_process(dyc)
+        assert path.read().startswith('"""\n<docstring>\n"""\ndef b(c):\n    """')
+
+    def test_parallel_scan_matches_serial(self, tmpdir):
+        """Test that scanning in a process pool documents like a serial scan"""
+        contents = ["def a{}(x):\n    return x\n".format(i) * (i + 1) for i in range(4)]
+        results = []
+        for jobs in (1, 2):
+            paths = []
+            for index, content in enumerate(contents):
+                path = tmpdir.join("jobs{}_{}.py".format(jobs, index))
+                path.write(content)
+                paths.append(str(path))
+            dyc = make_dyc(paths)
+            dyc.jobs = jobs
+            run_process(dyc)
+            results.append([open(path).read() for path in paths])
+        assert results[0] == results[1]
+        assert all("<docstring>" in content for content in results[1])
+
+    def test_methods_with_the_same_name(self, tmpdir):
+        """Test that methods sharing a name in one file are all documented"""
+        path = tmpdir.join("sample.py")
+        path.write(
+            "class A:\n    def run(self, x):\n        return x\n\n\n"
+            "class B:\n    def run(self, y):\n        return y\n"
+        )
+        dyc = make_dyc([str(path)])
+        run_process(dyc)
+        content = path.read()
+        assert content.count("<docstring>") == 5
+        assert content.count('    def run(self, x):\n        """') == 1
+        assert content.count('    def run(self, y):\n        """') == 1
+
+
+class TestRunState:
+    def test_state_is_per_run(self, tmpdir):
+        """Test that builders of different runs do not share details"""
+        path = tmpdir.join("sample.py")
+        path.write("def a(x):\n    return x\n")
+        first = make_dyc([str(path)])._builder("method", str(path))
+        second = make_dyc([str(path)])._builder("method", str(path))
+        first.initialize()
+        assert list(first.details[str(path)]) == [1]
+        assert second.details == {}
+        first.clear(str(path))
+        assert first.details == {}
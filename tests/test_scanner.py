@@ -0,0 +1,149 @@
+import pickle
+from dyc.configs import Config
+from dyc.main import create_builder
+from dyc.scanner import (
+    SourceBuffer,
+    MappedSource,
+    Candidate,
+    ScopeTree,
+    open_source,
+)
+
+
+class TestSourceBuffer:
+    def test_reads_lines_once(self, tmpdir):
+        """Test that the buffer holds every line of the file"""
+        path = tmpdir.join("sample.py")
+        path.write("def a():\n    pass\n")
+        source = SourceBuffer(str(path))
+        assert len(source) == 2
+        assert source.line(1) == "def a():\n"
+
+    def test_out_of_range_line(self):
+        """Test that out of range lines are empty like linecache"""
+        source = SourceBuffer("unused", lines=["x = 1\n"])
+        assert source.line(0) == ""
+        assert source.line(2) == ""
+
+    def test_offsets(self):
+        """Test the offset table points to the start of every line"""
+        source = SourceBuffer("unused", lines=["ab\n", "cde\n", "f"])
+        assert source.offsets == [0, 3, 7, 8]
+
+    def test_text(self):
+        """Test joining a range of lines"""
+        source = SourceBuffer("unused", lines=["a\n", "b\n", "c\n"])
+        assert source.text(2, 3) == "b\nc\n"
+
+    def test_apply_insertions(self, tmpdir):
+        """Test that all insertions are written in one pass and in order"""
+        path = tmpdir.join("sample.py")
+        path.write("a\nb\nc")
+        source = SourceBuffer(str(path))
+        source.apply_insertions([(3, "2\n"), (1, "0\n"), (1, "1\n"), (4, "3\n")])
+        assert path.read() == "0\n1\na\nb\n2\nc\n3\n"
+        assert source.lines == ["0\n", "1\n", "a\n", "b\n", "2\n", "c\n", "3\n"]
+
+
+class TestMappedSource:
+    content = "class A:\r\n    def b(self):\r\n        pass\r\n\r\ndefault = 1"
+
+    def test_reads_like_a_buffer(self, tmpdir):
+        """Test that a mapped file gives the same lines and hash as a buffer"""
+        path = tmpdir.join("sample.py")
+        path.write_binary(self.content.encode("utf-8"))
+        source = MappedSource(str(path))
+        buffer = SourceBuffer(str(path))
+        assert len(source) == len(buffer) == 5
+        assert list(source) == buffer.lines
+        assert source.line(2) == "    def b(self):\n"
+        assert source.line(6) == ""
+        assert source.text(2, 3) == buffer.text(2, 3)
+        assert source.digest() == buffer.digest()
+        assert source.scopes.end(2, 4) == buffer.scopes.end(2, 4) == 4
+
+    def test_finds_keywords_in_bytes(self, tmpdir):
+        """Test that keyword lines are found without decoding the file"""
+        path = tmpdir.join("sample.py")
+        path.write_binary(self.content.encode("utf-8"))
+        source = MappedSource(str(path))
+        assert source.find_lines(["def"]) == [2, 5]
+        assert list(SourceBuffer(str(path)).find_lines(["def"])) == [2, 5]
+
+    def test_streams_insertions(self, tmpdir):
+        """Test that insertions are written like a buffer writes them"""
+        path = tmpdir.join("sample.py")
+        path.write("def a():\n    pass")
+        source = MappedSource(str(path))
+        source.apply_insertions([(2, '    """doc"""\n'), (3, "b = 1\n")])
+        assert path.read() == 'def a():\n    """doc"""\n    pass\nb = 1\n'
+        assert len(source) == 4
+
+    def test_large_files_are_mapped(self, tmpdir, monkeypatch):
+        """Test that only files above the threshold are mapped"""
+        path = tmpdir.join("sample.py")
+        path.write("x = 1\n")
+        assert not open_source(str(path)).mapped
+        monkeypatch.setattr("dyc.scanner.MMAP_THRESHOLD", 1)
+        assert open_source(str(path)).mapped
+
+
+class TestScopeTree:
+    lines = [
+        "class A:\n",
+        "    def b(self):\n",
+        "        def c():\n",
+        "            pass\n",
+        "\n",
+        "        return c\n",
+        "\n",
+        "    def d(\n",
+        "        self, x):\n",
+        "        return x\n",
+        "\n",
+        "e = 1\n",
+    ]
+
+    def test_scope_ends(self):
+        """Test that nested scopes end before the next line at their indent"""
+        tree = ScopeTree(self.lines)
+        assert tree.end(1, 0) == 11
+        assert tree.end(2, 4) == 7
+        assert tree.end(3, 8) == 5
+        assert tree.end(9, 4) == 11
+        assert tree.end(12, 0) == 12
+
+    def test_first_after_skips_blank_lines(self):
+        """Test that the first body line skips blank lines"""
+        tree = ScopeTree(self.lines)
+        assert tree.first_after(4) == 6
+        assert tree.first_after(12) == 13
+
+    def test_buffer_rebuilds_tree_after_insertions(self, tmpdir):
+        """Test that the tree follows the buffer after it is written"""
+        path = tmpdir.join("sample.py")
+        path.write("def a():\n    pass\nb = 1\n")
+        source = SourceBuffer(str(path))
+        assert source.scopes.end(1, 0) == 2
+        source.apply_insertions([(2, '    """doc"""\n')])
+        assert source.scopes.end(1, 0) == 3
+
+
+class TestCandidate:
+    def test_candidate_pickles_without_source(self):
+        """Test that a candidate round-trips through pickle as a small record"""
+        candidate = Candidate("a", 2, 5, 1, "    ", ["x"])
+        restored = pickle.loads(pickle.dumps(candidate))
+        assert restored == candidate
+        assert not hasattr(candidate, "__dict__")
+
+    def test_interface_reads_body_lazily(self, tmpdir):
+        """Test that the body of a confirmed method comes from the source buffer"""
+        path = tmpdir.join("sample.py")
+        path.write("def a(\n    x):\n    return x\n\ny = 1\n")
+        builder = create_builder("method", str(path), Config.default["formats"][0])
+        (candidate,) = builder.scan()
+        assert (candidate.decl_start, candidate.start, candidate.end) == (1, 2, 4)
+        interface = builder.interface(candidate)
+        assert interface._plain is None
+        assert interface.plain == "def a(\n    x):\n    return x\n\n"
@@ -1,9 +1,15 @@
+import os
 from dyc.utils import (
     get_leading_whitespace,
     read_yaml,
     get_indent,
     get_extension,
     is_comment,
+    get_additions_in_first_hunk,
+    HunkIndex,
+    all_files_generator,
+    git_files,
+    PathRules,
 )
 
 
@@ -143,3 +149,100 @@ class TestIsComment:
         """Testing invalid comments"""
         text = "# Hello World"
         assert is_comment(text, ["//"]) == False
+
+
+class TestPathRules:
+    def test_name_glob_matches_at_any_depth(self):
+        """Testing a glob without a slash matches names anywhere"""
+        rules = PathRules(["node_modules", "*.min.js"])
+        assert rules.match("node_modules")
+        assert rules.match("web/node_modules")
+        assert rules.match("web/app.min.js")
+        assert not rules.match("web/app.js")
+
+    def test_path_glob_and_regex(self):
+        """Testing globs with a slash and `re:` rules match the relative path"""
+        rules = PathRules(["build/*", "re:gen_.*\\.py$"])
+        assert rules.match("build/lib.py")
+        assert not rules.match("src/build/lib.py")
+        assert rules.match("gen_models.py")
+
+    def test_match_tree(self):
+        """Testing a file matches through one of its parent directories"""
+        rules = PathRules(["vendor"])
+        assert rules.match_tree("src/vendor/lib/a.py")
+        assert not rules.match_tree("src/lib/a.py")
+
+    def test_empty_rules_are_falsy(self):
+        """Testing no rules means nothing to apply"""
+        assert not PathRules([])
+
+
+class TestAllFilesGenerator:
+    def test_excluded_directories_are_pruned(self, tmpdir):
+        """Testing excluded directories are never walked into"""
+        tmpdir.mkdir("src").join("a.py").write("")
+        tmpdir.mkdir("venv").join("b.py").write("")
+        with tmpdir.as_cwd():
+            files = [
+                f
+                for paths in all_files_generator(
+                    extensions=["py"], excludes=PathRules(["venv"])
+                )
+                for f in paths
+            ]
+        assert [os.path.basename(f) for f in files] == ["a.py"]
+
+
+class TestGitFiles:
+    def test_lists_index_and_untracked_files(self, tmpdir):
+        """Testing files come from git, honouring .gitignore"""
+        import git
+
+        repo = git.Repo.init(str(tmpdir))
+        tmpdir.join(".gitignore").write("ignored/\n")
+        tmpdir.join("tracked.py").write("")
+        tmpdir.join("notes.txt").write("")
+        tmpdir.mkdir("ignored").join("skip.py").write("")
+        repo.index.add(["tracked.py"])
+        tmpdir.join("new.py").write("")
+
+        with tmpdir.as_cwd():
+            names = sorted(
+                os.path.basename(f) for f in git_files(repo, extensions=["py"])
+            )
+            tracked_only = git_files(repo, extensions=["py"], untracked=False)
+        assert names == ["new.py", "tracked.py"]
+        assert [os.path.basename(f) for f in tracked_only] == ["tracked.py"]
+
+
+class TestGetAdditionsInFirstHunk:
+    def test_with_count(self):
+        """Testing a hunk with an explicit count of added lines"""
+        assert get_additions_in_first_hunk(["-3,0 +4,2"]) == (4, 6)
+
+    def test_single_line_without_count(self):
+        """Testing a hunk of a single line, which git writes without count"""
+        assert get_additions_in_first_hunk(["-3 +4"]) == (4, 5)
+
+
+class TestHunkIndex:
+    def test_find(self):
+        """Testing the hunk holding a line is found by bisection"""
+        hunks = [
+            dict(hunk=(20, 22), patch="b"),
+            dict(hunk=(3, 5), patch="a"),
+            dict(hunk=(0, 0), patch=""),
+        ]
+        index = HunkIndex(hunks)
+        assert len(index) == 2
+        assert index.find(4)["patch"] == "a"
+        assert index.find(22)["patch"] == "b"
+        assert index.find(10) is None
+        assert index.find(1) is None
+
+    def test_added_lines(self):
+        """Testing the added lines of a hunk are looked up as a set"""
+        hunk = dict(hunk=(1, 3), patch="def a():\n    pass")
+        index = HunkIndex([hunk])
+        assert "def a():" in index.added_lines(hunk)